@@ -0,0 +1,190 @@
+# Native client for the ADB server's smart-socket protocol (no adb process per command)
+import codecs
+import re
+import socket
+import struct
+import threading
+import uuid
+
+ADB_SERVER_HOST, ADB_SERVER_PORT = '127.0.0.1', 5037
+SOCKET_TIMEOUT = 30
+BATCH_SENTINEL = '__BWR_DONE__'
+# Shell protocol v2 packet ids (see adb's shell_protocol.h)
+ID_STDIN, ID_STDOUT, ID_STDERR, ID_EXIT = 0, 1, 2, 3
+
+class AdbError(Exception):
+    """Raised when the ADB server answers FAIL or the connection breaks."""
+
+class ShellV2Unsupported(AdbError):
+    """Raised instead of opening a session on a device whose adbd lacks the `shell_v2` feature (before Android 7); spawning adb still works there."""
+
+# --- LOW LEVEL CONNECTION ---
+class AdbConnection:
+    """One socket to the ADB server, speaking the length-prefixed request / OKAY-FAIL reply protocol."""
+    def __init__(self, host=ADB_SERVER_HOST, port=ADB_SERVER_PORT, timeout=SOCKET_TIMEOUT):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+    def close(self):
+        try: self.sock.close()
+        except OSError: pass
+    def send_request(self, service):
+        payload = service.encode('utf-8')
+        self.sock.sendall(b'%04x' % len(payload) + payload); self.read_status()
+    def read_status(self):
+        status = self.read_exactly(4)
+        if status == b'OKAY': return
+        if status == b'FAIL': raise AdbError(self.read_string())
+        raise AdbError(f"Unexpected reply from ADB server: {status!r}")
+    def read_string(self):
+        return self.read_exactly(int(self.read_exactly(4), 16)).decode('utf-8', 'replace')
+    def read_exactly(self, size):
+        chunks = []
+        while size:
+            chunk = self.sock.recv(size)
+            if not chunk: raise AdbError("Connection closed by ADB server")
+            chunks.append(chunk); size -= len(chunk)
+        return b''.join(chunks)
+    def read_all(self):
+        chunks = []
+        while chunk := self.sock.recv(65536): chunks.append(chunk)
+        return b''.join(chunks).decode('utf-8', 'replace')
+    def switch_transport(self, serial=None):
+        self.send_request(f"host:transport:{serial}" if serial else "host:transport-any")
+
+def parse_sentinel(line, token):
+    """Splits a `<output><token> <index> <status>` line into (output, index, status), or returns None for ordinary output.
+    The token must end the line followed by two numbers: a PTY shell (pre-Nougat `adb shell`) echoes the script line
+    `... echo "<token> 0 $?"` back, and that echo is ordinary output."""
+    match = re.search(re.escape(token) + r' (\d+) (\d+)$', line)
+    if match is None: return None
+    return (line[:match.start()], int(match.group(1)), int(match.group(2)))
+
+# --- PERSISTENT SHELL SESSION ---
+class ShellSession:
+    """A long-lived `sh` on the device over shell protocol v2; commands are fed through stdin and delimited by sentinels."""
+    def __init__(self, serial=None, host=ADB_SERVER_HOST, port=ADB_SERVER_PORT):
+        self.serial, self.conn = serial, AdbConnection(host, port, timeout=None)
+        try: self.conn.switch_transport(serial); self.conn.send_request("shell,v2,raw:")
+        except Exception: self.conn.close(); raise
+        self.decoder, self.pending, self.alive = codecs.getincrementaldecoder('utf-8')('replace'), '', True
+        # reused: handed out from the pool; replied: the current command got at least one packet back.
+        self.reused = self.replied = False
+    def close(self):
+        self.alive = False; self.conn.close()
+    def _send_packet(self, packet_id, data=b''):
+        self.conn.sock.sendall(struct.pack('<BI', packet_id, len(data)) + data)
+    def _read_lines(self):
+        """Yields complete stdout/stderr lines as packets arrive."""
+        while True:
+            packet_id, length = struct.unpack('<BI', self.conn.read_exactly(5)); self.replied = True
+            data = self.conn.read_exactly(length) if length else b''
+            if packet_id == ID_EXIT: self.alive = False; raise AdbError("Device shell exited")
+            if packet_id not in (ID_STDOUT, ID_STDERR): continue
+            self.pending += self.decoder.decode(data)
+            *lines, self.pending = self.pending.split('\n')
+            yield from lines
+    def run_batch(self, commands):
+        """Yields (index, exit_code, output) for each command, in order, as soon as its sentinel comes back."""
+        token = f"{BATCH_SENTINEL}{uuid.uuid4().hex[:8]}"
+        script = ''.join(f"{cmd} 2>&1; echo \"{token} {i} $?\"\n" for i, cmd in enumerate(commands))
+        self.replied = False
+        try:
+            self._send_packet(ID_STDIN, script.encode('utf-8'))
+            if not commands: return
+            buffer = []
+            for line in self._read_lines():
+                sentinel = parse_sentinel(line.rstrip('\r'), token)
+                if sentinel is None: buffer.append(line.rstrip('\r')); continue
+                tail, index, code = sentinel; buffer.append(tail)
+                yield (index, code, '\n'.join(buffer).strip()); buffer = []
+                if index == len(commands) - 1: return
+        except (OSError, AdbError):
+            self.close(); raise
+    def stream(self, command):
+        """Yields one command's output lines as they arrive and returns its exit code (`code = yield from session.stream(...)`)."""
+        token = f"{BATCH_SENTINEL}{uuid.uuid4().hex[:8]}"; self.replied = False
+        try:
+            self._send_packet(ID_STDIN, f"{command} 2>&1; echo \"{token} 0 $?\"\n".encode('utf-8'))
+            for line in self._read_lines():
+                sentinel = parse_sentinel(line.rstrip('\r'), token)
+                if sentinel is None: yield line.rstrip('\r'); continue
+                if sentinel[0]: yield sentinel[0]
+                return sentinel[2]
+        except (OSError, AdbError):
+            self.close(); raise
+    def run(self, command):
+        for _, code, output in self.run_batch([command]): return (code, output)
+        raise AdbError("No result from device shell")
+
+# --- CLIENT WITH CONNECTION POOL ---
+class AdbClient:
+    """Talks to the ADB server directly, keeping idle shell sessions pooled per device serial for reuse."""
+    def __init__(self, host=ADB_SERVER_HOST, port=ADB_SERVER_PORT, max_idle_per_device=4):
+        self.host, self.port, self.max_idle_per_device = host, port, max_idle_per_device
+        self._idle, self._features, self._lock = {}, {}, threading.Lock()
+    def connect(self): return AdbConnection(self.host, self.port)
+    def host_command(self, service, reply=True):
+        """Runs a `host:` service; returns its length-prefixed reply (or '' for services that reply with a bare OKAY)."""
+        conn = self.connect()
+        try: conn.send_request(service); return conn.read_string() if reply else ''
+        finally: conn.close()
+    def devices(self, long=True): return self.host_command("host:devices-l" if long else "host:devices")
+    def kill_server(self):
+        self.close()
+        try: self.host_command("host:kill", reply=False)
+        except AdbError: pass  # The server drops the socket as it exits
+    def device_service(self, serial, service):
+        """Runs a one-shot device service such as `reboot:recovery` and returns whatever it writes before closing."""
+        conn = self.connect()
+        try: conn.switch_transport(serial); conn.send_request(service); return conn.read_all()
+        finally: conn.close()
+    def features(self, serial=None):
+        """The device's adbd feature set (`shell_v2`, `cmd`, ...), asked once per serial and cached."""
+        with self._lock: features = self._features.get(serial)
+        if features is None:
+            features = frozenset(self.host_command(f"host-serial:{serial}:features" if serial else "host:features").split(','))
+            with self._lock: self._features[serial] = features
+        return features
+    def acquire_shell(self, serial=None):
+        with self._lock:
+            sessions = self._idle.get(serial)
+            while sessions:
+                session = sessions.pop()
+                if session.alive: session.reused = True; return session
+        if 'shell_v2' not in self.features(serial): raise ShellV2Unsupported(f"{serial or 'The device'} does not support shell protocol v2")
+        return ShellSession(serial, self.host, self.port)
+    def release_shell(self, session):
+        if not session.alive: return
+        with self._lock:
+            sessions = self._idle.setdefault(session.serial, [])
+            if len(sessions) < self.max_idle_per_device: sessions.append(session); return
+        session.close()
+    def discard_shells(self, serial=None):
+        """Closes the idle sessions of one device, e.g. after a reboot, when their server sockets are about to go away."""
+        with self._lock: sessions = self._idle.pop(serial, []); self._features.pop(serial, None)
+        for session in sessions: session.close()
+    def _on_session(self, serial, run):
+        """Drives the generator run(session) on a pooled session. A pooled session whose socket died while it sat idle
+        (device rebooted or replugged) fails before any reply; it is dropped and the run retried once on a fresh one."""
+        session, completed = self.acquire_shell(serial), False
+        try:
+            try: result = yield from run(session); completed = True; return result
+            except (OSError, AdbError):
+                if not session.reused or session.replied: raise
+            session.close(); session = ShellSession(serial, self.host, self.port)
+            result = yield from run(session); completed = True; return result
+        finally:
+            # A batch abandoned half way still has output in flight, so that session cannot be reused.
+            if completed: self.release_shell(session)
+            else: session.close()
+    def shell(self, serial, command):
+        """Runs one shell command on a pooled session and returns (exit_code, output)."""
+        for _, code, output in list(self.shell_batch(serial, [command])): return (code, output)
+        raise AdbError("No result from device shell")
+    def shell_batch(self, serial, commands):
+        return self._on_session(serial, lambda session: session.run_batch(commands))
+    def shell_stream(self, serial, command):
+        """Streams one command's output lines from a pooled session; the generator's return value is the exit code."""
+        return self._on_session(serial, lambda session: session.stream(command))
+    def close(self):
+        with self._lock: sessions, self._idle, self._features = [s for pool in self._idle.values() for s in pool], {}, {}
+        for session in sessions: session.close()
@@ -0,0 +1,209 @@
+# Benchmarks of the app's own code paths against fake devices (fake_adb), with JSON baselines for regression checks
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+import adb_client
+import engine
+import remover
+from fake_adb import FakeAdbServer, make_fleet
+from package_view import PackageListModel, VirtualTreeView
+from search import SearchIndex
+from snapshots import SnapshotStore
+
+VISIBLE_ROWS = 30
+TYPED_QUERIES = ('com.google.android', 'samsung', 'facebook', 'xyz')
+DEFAULT_TOLERANCE = 0.25
+
+# --- HEADLESS STAND-INS FOR THE TK WIDGETS ---
+# The timed methods are the real App ones; only the widgets they poke are replaced, so this runs without a display
+# and the numbers exclude Tk's own drawing.
+class HeadlessRoot:
+    def after(self, ms, func=None, *args):
+        if func: func(*args)
+        return 'after#0'
+    def after_cancel(self, after_id): pass
+    def quit(self): pass
+
+class HeadlessVar:
+    def __init__(self, value=''): self.value = value
+    def get(self): return self.value
+    def set(self, value): self.value = value
+
+class HeadlessWidget:
+    """Accepts the Treeview / Scrollbar / Button calls the app makes and records nothing but the item ids."""
+    def __init__(self): self.items = {}
+    def insert(self, parent, index, iid=None, **options): self.items[iid] = options; return iid
+    def item(self, iid, **options): self.items[iid] = options
+    def delete(self, iid): self.items.pop(iid, None)
+    def detach(self, iid): pass
+    def move(self, iid, parent, index): pass
+    def bind(self, *args, **kwargs): pass
+    def configure(self, **options): pass
+    config = configure
+    def set(self, *args): pass
+    def selection_set(self, items): pass
+    def yview_moveto(self, fraction): pass
+
+def headless_view(model, render):
+    view = VirtualTreeView(HeadlessWidget(), HeadlessWidget(), model, render)
+    for slot in range(VISIBLE_ROWS):
+        view.slots.append(view.tree.insert('', 'end', iid=f"slot{slot}")); view.rendered.append(None)
+    return view
+
+def build_app():
+    """An App whose state mirrors App.__init__, minus the Tk widgets."""
+    app = object.__new__(remover.App)
+    app.root, app.log_sink = HeadlessRoot(), engine.LogSink(path=None)
+    app.all_uninstall_items, app.all_restore_items, app.pending_filters = [], [], {}
+    app.uninstall_index, app.restore_index = SearchIndex([], remover.item_search_text), SearchIndex([], remover.item_search_text)
+    app.checked_uninstall_items, app.checked_restore_items = set(), set()
+    app.sort_column, app.sort_reverse, app.tooltip_window, app.tooltip_item_id = None, False, None, None
+    app.uninstall_model = PackageListModel(app.checked_uninstall_items, remover.UNINSTALL_COLUMNS, remover.UNINSTALL_SORT_KEYS)
+    app.restore_model = PackageListModel(app.checked_restore_items, remover.RESTORE_COLUMNS)
+    app.uninstall_view, app.restore_view = headless_view(app.uninstall_model, remover.render_uninstall_row), headless_view(app.restore_model, remover.render_restore_row)
+    app.uninstall_search_var, app.restore_search_var = HeadlessVar(), HeadlessVar()
+    app.uninstall_btn, app.restore_btn, app.uninstall_rows = HeadlessWidget(), HeadlessWidget(), {}
+    app.show_completion_dialog = lambda title, summary: None
+    app.bloatware_data = app._load_bloatware_data()
+    app.engine = engine.Engine(log=app.log_message, catalog=app.bloatware_data)
+    return app
+
+# --- MEASUREMENT ---
+def timed(func, *args):
+    start = time.perf_counter(); func(*args); return time.perf_counter() - start
+
+def summarize(samples, **extra):
+    """Seconds per sample reduced to the stats a baseline keeps."""
+    ordered = sorted(samples)
+    return dict(runs=len(ordered), min=ordered[0], median=statistics.median(ordered), p95=ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                max=ordered[-1], mean=statistics.fmean(ordered), **extra)
+
+def measure(repeat, func, setup=None):
+    samples = []
+    for _ in range(repeat):
+        if setup: setup()
+        samples.append(timed(func))
+    return samples
+
+def bench_load_catalog(app, args):
+    cache = os.path.join(engine.CACHE_DIR, 'catalog.idx')
+    def drop_cache():
+        if os.path.exists(cache): os.remove(cache)
+    return {'load_bloatware_data.cold': summarize(measure(args.repeat, app._load_bloatware_data, drop_cache)),
+            'load_bloatware_data.warm': summarize(measure(args.repeat, app._load_bloatware_data))}
+
+def bench_scan(app, args, server, serials):
+    def forget():
+        # A device never scanned before: no snapshot on disk, no rows built.
+        server.reset(); shutil.rmtree(app.engine.snapshots.directory, ignore_errors=True)
+        app.engine.snapshots, app.engine.fleet_packages, app.uninstall_rows = SnapshotStore(engine.CACHE_DIR), {}, {}
+    first = measure(args.repeat, lambda: app._scan_bloatware_thread(serials), forget)
+    rescan = measure(args.repeat, lambda: app._scan_bloatware_thread(serials))
+    return {'scan_bloatware_thread.first': summarize(first, installed=args.packages, devices=len(serials)),
+            'scan_bloatware_thread.rescan': summarize(rescan, installed=args.packages, devices=len(serials))}
+
+def bench_uninstall(app, args, server, serials):
+    samples = []
+    for _ in range(args.repeat):
+        server.reset(); app._scan_bloatware_thread(serials)
+        waves = app.engine.plan([item[1] for item in app.all_uninstall_items[:args.uninstall_count]]).waves
+        samples.append(timed(app._uninstall_thread, waves, serials))
+    count = min(args.uninstall_count, len(app.all_uninstall_items)) * len(serials)
+    return {'uninstall_thread': summarize(samples, packages=count, packages_per_second=count / statistics.median(samples))}
+
+def bench_filter(app, args, server, serials):
+    server.reset(); app._scan_bloatware_thread(serials)
+    samples = []
+    for _ in range(args.repeat):
+        for query in TYPED_QUERIES:
+            app.uninstall_search_var.set(''); app.filter_uninstall_list()
+            for length in range(1, len(query) + 1):
+                app.uninstall_search_var.set(query[:length]); samples.append(timed(app.filter_uninstall_list))
+    return {'filter_list.keystroke': summarize(samples, rows=len(app.all_uninstall_items))}
+
+def bench_sort(app, args, server, serials):
+    server.reset(); app._scan_bloatware_thread(serials); app.uninstall_search_var.set(''); app.filter_uninstall_list()
+    results = {}
+    for column in ("Package", "Level", "Version", "Description"):
+        def unsorted():
+            app.sort_column, app.sort_reverse = None, False
+            app.uninstall_model.sort(None); app.uninstall_model.set_items(app.all_uninstall_items)
+        first = measure(args.repeat, lambda: app.sort_treeview_column(column), unsorted)
+        # Clicking the same heading again flips the order.
+        flip = measure(args.repeat, lambda: app.sort_treeview_column(column))
+        results[f'sort_treeview_column.{column}.first'] = summarize(first, rows=len(app.all_uninstall_items))
+        results[f'sort_treeview_column.{column}.toggle'] = summarize(flip, rows=len(app.all_uninstall_items))
+    return results
+
+# --- BASELINES ---
+def compare(results, baseline, tolerance):
+    """Returns (name, baseline median, current median) for every benchmark whose median grew by more than tolerance."""
+    return [(name, old['median'], results[name]['median']) for name, old in sorted(baseline.get('results', {}).items())
+            if name in results and results[name]['median'] > old['median'] * (1 + tolerance)]
+
+def format_table(results):
+    lines = [f"{'benchmark':<40} {'median ms':>10} {'p95 ms':>10} {'max ms':>10}  extra"]
+    for name, stats in sorted(results.items()):
+        extra = ', '.join(f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}" for key, value in stats.items() if key not in ('runs', 'min', 'median', 'p95', 'max', 'mean'))
+        lines.append(f"{name:<40} {stats['median'] * 1000:>10.2f} {stats['p95'] * 1000:>10.2f} {stats['max'] * 1000:>10.2f}  {extra}")
+    return '\n'.join(lines)
+
+def run(args):
+    catalog_file = os.path.abspath(args.catalog)
+    with open(catalog_file, 'r', encoding='utf-8') as f: catalog_ids = [entry['id'] for entry in json.load(f)]
+    server = FakeAdbServer(make_fleet(args.devices, args.packages, args.latency_ms / 1000, args.jitter_ms / 1000, args.failure_rate, args.seed, catalog_ids)).start()
+    workdir, cwd = tempfile.mkdtemp(prefix='bwr-bench-'), os.getcwd()
+    native_client, native_flag = engine.adb_client, engine.USE_NATIVE_ADB
+    try:
+        # Logs, caches, snapshots and history all land in a scratch directory; adb traffic goes to the fake server.
+        os.chdir(workdir); remover.UAD_LIST_FILE = engine.UAD_LIST_FILE = catalog_file
+        engine.adb_client, engine.USE_NATIVE_ADB = adb_client.AdbClient(port=server.port), True
+        app = build_app()
+        serials = [device['serial'] for device in engine.list_devices()[0]]
+        results = bench_load_catalog(app, args)
+        for bench in (bench_scan, bench_uninstall, bench_filter, bench_sort): results.update(bench(app, args, server, serials))
+        engine.adb_client.close()
+    finally:
+        engine.adb_client, engine.USE_NATIVE_ADB = native_client, native_flag
+        os.chdir(cwd); shutil.rmtree(workdir, ignore_errors=True); server.stop()
+    config = {key: getattr(args, key) for key in ('devices', 'packages', 'latency_ms', 'jitter_ms', 'failure_rate', 'uninstall_count', 'repeat', 'seed')}
+    return {'created': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(), 'platform': platform.platform(), 'config': config, 'results': results}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the remover's scan, uninstall, filter and sort paths against fake devices.")
+    parser.add_argument('--catalog', default='uad_lists.json')
+    parser.add_argument('--devices', type=int, default=1)
+    parser.add_argument('--packages', type=int, default=5000, help="packages installed on each fake device")
+    parser.add_argument('--latency-ms', type=float, default=2.0, help="device-side time per shell command")
+    parser.add_argument('--jitter-ms', type=float, default=1.0)
+    parser.add_argument('--failure-rate', type=float, default=0.02, help="chance that an uninstall fails")
+    parser.add_argument('--uninstall-count', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', metavar='FILE', help="write the results as a JSON baseline")
+    parser.add_argument('--compare', metavar='FILE', help="exit 1 if any median regressed past --tolerance against this baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="allowed median slowdown, as a fraction")
+    args = parser.parse_args(argv)
+    report = run(args)
+    print(format_table(report['results']))
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f: json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.save}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f: baseline = json.load(f)
+        if baseline.get('config') != report['config']: print("Warning: the baseline was recorded with a different configuration.")
+        regressions = compare(report['results'], baseline, args.tolerance)
+        for name, old, new in regressions: print(f"REGRESSION {name}: {old * 1000:.2f} ms -> {new * 1000:.2f} ms")
+        if regressions: return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
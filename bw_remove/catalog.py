@@ -0,0 +1,109 @@
+# Compiled, memory-compact cache of the uad_lists.json bloatware database
+import hashlib
+import json
+import mmap
+import os
+import sys
+from array import array
+
+CACHE_VERSION = 2
+CATALOG_INDEX_FILE, CATALOG_DESC_FILE = 'catalog.idx', 'catalog.desc'
+
+def file_digest(path):
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''): sha.update(chunk)
+    return sha.hexdigest()
+
+class CatalogEntry:
+    """Lightweight view of one catalog row; the description is only read from the blob when first asked for."""
+    __slots__ = ('catalog', 'row', 'id', 'list', 'removal')
+    def __init__(self, catalog, row):
+        self.catalog, self.row, self.id = catalog, row, catalog.ids[row]
+        self.list, self.removal = catalog.lists[catalog.list_codes[row]], catalog.levels[catalog.removal_codes[row]]
+    @property
+    def description(self): return self.catalog.description_at(self.row)
+
+class Catalog:
+    """Array-backed bloatware database: one row per package, interned list/removal tables, descriptions in a lazily mapped blob."""
+    def __init__(self, ids, lists, levels, list_codes, removal_codes, desc_offsets, dependencies, needed_by, descriptions=b''):
+        self.ids, self.lists, self.levels = ids, lists, levels
+        self.list_codes, self.removal_codes, self.desc_offsets = list_codes, removal_codes, desc_offsets
+        self.dependencies, self.needed_by, self.descriptions = dependencies, needed_by, descriptions
+        self.index = {pkg: row for row, pkg in enumerate(ids)}
+    @classmethod
+    def empty(cls): return cls((), (), (), array('B'), array('B'), array('I', [0]), {}, {})
+    def __len__(self): return len(self.index)
+    def __contains__(self, pkg): return pkg in self.index
+    def __iter__(self): return iter(self.index)
+    def keys(self): return self.index.keys()
+    def get(self, pkg, default=None):
+        row = self.index.get(pkg)
+        return default if row is None else CatalogEntry(self, row)
+    def removal(self, pkg, default=None):
+        row = self.index.get(pkg)
+        return default if row is None else self.levels[self.removal_codes[row]]
+    def description_at(self, row):
+        return bytes(self.descriptions[self.desc_offsets[row]:self.desc_offsets[row + 1]]).decode('utf-8')
+    def payload(self):
+        return (self.ids, self.lists, self.levels, self.list_codes, self.removal_codes, self.desc_offsets, self.dependencies, self.needed_by)
+
+def compile_catalog(data):
+    """Turns the parsed uad_lists.json array into a Catalog plus its utf-8 description blob."""
+    ids, tables, list_codes, removal_codes = [], ({}, {}), array('B'), array('B')
+    desc_offsets, blob, links = array('I', [0]), bytearray(), ([], [])
+    for item in data:
+        row = len(ids); ids.append(sys.intern(item['id']))
+        for codes, table, value in ((list_codes, tables[0], item.get('list', 'Unknown')), (removal_codes, tables[1], item.get('removal', 'Unknown'))):
+            codes.append(table.setdefault(sys.intern(value), len(table)))
+        blob += item.get('description', '').encode('utf-8'); desc_offsets.append(len(blob))
+        for pairs, key in zip(links, ('dependencies', 'neededBy')):
+            if item.get(key): pairs.append((row, tuple(sys.intern(pkg) for pkg in item[key])))
+    lists, levels, blob = *(tuple(table) for table in tables), bytes(blob)
+    return Catalog(tuple(ids), lists, levels, list_codes, removal_codes, desc_offsets, dict(links[0]), dict(links[1]), blob), blob
+
+def _map_descriptions(path, expected_size):
+    if not expected_size: return b''
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size != expected_size: raise ValueError("Description blob does not match index")
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def _write_atomic(path, data):
+    with open(path + '.tmp', 'wb') as f: f.write(data)
+    os.replace(path + '.tmp', path)
+
+def _index_bytes(header, payload):
+    """The index file as plain JSON: a tampered cache can at worst fail to parse, never run code the way a pickle can."""
+    ids, lists, levels, list_codes, removal_codes, desc_offsets, dependencies, needed_by = payload
+    stored = [ids, lists, levels, list_codes.tolist(), removal_codes.tolist(), desc_offsets.tolist(), list(dependencies.items()), list(needed_by.items())]
+    return json.dumps({'header': header, 'payload': stored}, separators=(',', ':')).encode('utf-8')
+
+def _payload_from(stored):
+    ids, lists, levels, list_codes, removal_codes, desc_offsets, dependencies, needed_by = stored
+    if not len(ids) == len(list_codes) == len(removal_codes) == len(desc_offsets) - 1: raise ValueError("Catalog index is inconsistent")
+    def links(pairs): return {row: tuple(map(sys.intern, pkgs)) for row, pkgs in pairs}
+    return (tuple(map(sys.intern, ids)), tuple(lists), tuple(levels), array('B', list_codes), array('B', removal_codes), array('I', desc_offsets), links(dependencies), links(needed_by))
+
+def load_catalog(source, cache_dir):
+    """Loads the catalog from the compiled cache in cache_dir, rebuilding it when the source's mtime/size and hash changed."""
+    stat = os.stat(source)
+    index_path, desc_path = os.path.join(cache_dir, CATALOG_INDEX_FILE), os.path.join(cache_dir, CATALOG_DESC_FILE)
+    digest = None
+    try:
+        with open(index_path, 'rb') as f: stored = json.load(f)
+        header = stored['header']
+        if header['version'] == CACHE_VERSION:
+            stamp_matches = (header['mtime_ns'], header['size']) == (stat.st_mtime_ns, stat.st_size)
+            # A touched but unchanged file (e.g. after a fresh checkout) only costs a hash, not a rebuild.
+            if not stamp_matches and (digest := file_digest(source)) == header['sha1']:
+                header.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size); _write_atomic(index_path, _index_bytes(header, _payload_from(stored['payload']))); stamp_matches = True
+            if stamp_matches: return Catalog(*_payload_from(stored['payload']), descriptions=_map_descriptions(desc_path, header['desc_size']))
+    except (OSError, ValueError, KeyError, TypeError, OverflowError): pass
+    with open(source, 'r', encoding='utf-8') as f: data = json.load(f)
+    catalog, blob = compile_catalog(data)
+    header = {'version': CACHE_VERSION, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha1': digest or file_digest(source), 'desc_size': len(blob)}
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_atomic(desc_path, blob); _write_atomic(index_path, _index_bytes(header, catalog.payload()))
+    except OSError: pass  # Read-only location: keep working from the in-memory catalog
+    return catalog
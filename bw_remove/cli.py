@@ -0,0 +1,145 @@
+# Headless command-line front end over the engine, for scripted provisioning (never imports tkinter)
+import argparse
+import json
+import sqlite3
+import sys
+from engine import LEVEL_ORDER, Engine, LogSink, fleet_summary
+from package_info import PackageInfo
+from tracing import tracer
+
+EXIT_OK, EXIT_FAILURES, EXIT_ERROR = 0, 1, 2
+
+def fail(message):
+    print(f"Error: {message}", file=sys.stderr); return EXIT_ERROR
+
+def emit(args, payload, text):
+    """Prints payload as JSON with --json, otherwise the human-readable text."""
+    print(json.dumps(payload, indent=2) if args.json else text)
+
+def device_key(serial): return serial or 'default'
+
+def results_payload(results):
+    return {device_key(serial): [{'package': pkg, 'outcome': outcome, 'error': error} for pkg, outcome, error in rows] for serial, rows in results.items()}
+
+def resolve_serials(engine, args, fallback=None):
+    """Returns (serials, error): --serial as given, every ready device with --all-devices, else fallback (None lets adb pick)."""
+    if args.serial:
+        engine.devices = [{'serial': serial, 'state': 'device'} for serial in args.serial]
+        return (args.serial, None)
+    if args.all_devices:
+        _, error = engine.refresh_devices()
+        if error: return ([], error)
+        if not engine.devices: return ([], "no ready devices attached")
+        return ([d['serial'] for d in engine.devices], None)
+    return ([fallback], None)
+
+# --- COMMANDS ---
+def cmd_devices(engine, args):
+    devices, error = engine.refresh_devices()
+    if error: return fail(error)
+    emit(args, devices, "\n".join(f"{d['serial']}\t{d['state']}\t{d.get('model', '')}" for d in devices) or "No devices attached.")
+    return EXIT_OK
+
+def cmd_scan(engine, args):
+    serials, error = resolve_serials(engine, args)
+    if error: return fail(error)
+    detected = engine.scan(serials)
+    rows = [{'package': pkg, 'level': engine.catalog.removal(pkg), 'description': engine.catalog.get(pkg).description.strip(),
+             'devices': [device_key(serial) for serial in serials if pkg in engine.fleet_packages.get(serial, ())],
+             **(engine.package_details(pkg) or PackageInfo(None, None, None, None, None))._asdict()} for pkg in detected]
+    emit(args, {'packages': rows}, "\n".join(f"{row['level']:<12} {row['package']}" for row in rows) or "No known bloatware detected.")
+    return EXIT_OK
+
+def cmd_uninstall(engine, args):
+    if not args.level and not args.package: return fail("pass at least one --level or --package")
+    serials, error = resolve_serials(engine, args)
+    if error: return fail(error)
+    detected = engine.scan(serials)
+    selection = {pkg for pkg in detected if engine.catalog.removal(pkg) in set(args.level or ())} | (set(args.package or ()) & set(detected))
+    skipped = sorted(set(args.package or ()) - set(detected))
+    if skipped: engine.log(f"Not detected as known bloatware, skipped: {', '.join(skipped)}")
+    plan = engine.plan(selection)
+    if plan.at_risk and args.with_dependents: plan = engine.plan(selection | set(plan.at_risk))
+    packages = [pkg for wave in plan.waves for pkg in wave]
+    risky = sorted(pkg for pkg in packages if LEVEL_ORDER.get(engine.catalog.removal(pkg), 1) >= 3)
+    if risky and not args.force: return fail(f"{len(risky)} Expert/Unsafe package(s) selected ({', '.join(risky[:5])}{', ...' if len(risky) > 5 else ''}); pass --force to remove them anyway")
+    payload = {'waves': plan.waves, 'at_risk': plan.at_risk}
+    if args.dry_run or not packages:
+        emit(args, payload, "\n".join(f"Wave {i + 1}: {' '.join(wave)}" for i, wave in enumerate(plan.waves)) or "Nothing to uninstall.")
+        return EXIT_OK
+    for pkg, needs in plan.at_risk.items(): engine.log(f"Warning: {pkg} depends on {', '.join(needs)} and is being kept")
+    results = engine.uninstall(plan.waves, serials); payload['results'] = results_payload(results)
+    emit(args, payload, fleet_summary("Uninstall", results))
+    return EXIT_FAILURES if any(outcome != 'ok' for rows in results.values() for _, outcome, _ in rows) else EXIT_OK
+
+def cmd_restore(engine, args):
+    if not args.from_session and not args.package: return fail("pass --from-session and/or --package")
+    packages, session_serial = list(args.package or ()), None
+    if args.from_session:
+        try:
+            if args.from_session == 'latest':
+                latest = engine.history.sessions(0, 1)
+                session = engine.history.session(latest[0][0]) if latest else None
+            else: session = engine.history.session(int(args.from_session))
+            if session is None or session[1] != 'uninstall': return fail(f"no uninstall session {args.from_session}")
+            packages += [pkg for pkg in engine.history.session_packages(session[0]) if pkg not in packages]; session_serial = session[3]
+        except ValueError: return fail(f"invalid session id {args.from_session!r}")
+        except sqlite3.Error as e: return fail(f"could not read uninstall history: {e}")
+    # A session restores onto the device it came from unless told otherwise.
+    serials, error = resolve_serials(engine, args, fallback=session_serial)
+    if error: return fail(error)
+    if not packages: emit(args, {'results': {}}, "Nothing to restore."); return EXIT_OK
+    results = engine.restore(packages, serials)
+    emit(args, {'results': results_payload(results)}, fleet_summary("Restore", results))
+    return EXIT_FAILURES if any(outcome != 'ok' for rows in results.values() for _, outcome, _ in rows) else EXIT_OK
+
+def cmd_history(engine, args):
+    try: rows = engine.history.sessions(0, args.limit)
+    except sqlite3.Error as e: return fail(f"could not read uninstall history: {e}")
+    sessions = [{'id': row[0], 'started': row[1], 'serial': row[2], 'succeeded': row[3]} for row in rows]
+    emit(args, {'sessions': sessions}, "\n".join(f"{s['id']:>5}  {s['started']}  {s['serial'] or '-':<20} {s['succeeded']} app(s)" for s in sessions) or "No uninstall sessions recorded.")
+    return EXIT_OK
+
+# --- ARGUMENT PARSING ---
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description="Headless bloatware remover. You use it at your own risk; see the disclaimer in README.md.")
+    parser.add_argument('--json', action='store_true', help="machine-readable output on stdout")
+    parser.add_argument('--quiet', action='store_true', help="no progress lines on stderr (they still go to the log file)")
+    parser.add_argument('--trace', metavar='FILE', help="record timing spans, write them to FILE as a Chrome trace and print a summary on stderr")
+    commands = parser.add_subparsers(dest='command', required=True)
+    def command(name, handler, help_text, devices=True):
+        sub = commands.add_parser(name, help=help_text); sub.set_defaults(handler=handler)
+        if devices:
+            group = sub.add_mutually_exclusive_group()
+            group.add_argument('--serial', action='append', help="target device (repeatable); default is adb's single attached device")
+            group.add_argument('--all-devices', action='store_true', help="target every ready device")
+        return sub
+    command('devices', cmd_devices, "list attached devices", devices=False)
+    command('scan', cmd_scan, "list known bloatware installed on the device(s)")
+    uninstall = command('uninstall', cmd_uninstall, "uninstall detected bloatware by level and/or package")
+    uninstall.add_argument('--level', action='append', choices=list(LEVEL_ORDER), help="removal level to uninstall (repeatable)")
+    uninstall.add_argument('--package', action='append', help="package to uninstall if detected (repeatable)")
+    uninstall.add_argument('--with-dependents', action='store_true', help="also uninstall installed packages that depend on the selection")
+    uninstall.add_argument('--force', action='store_true', help="allow Expert and Unsafe packages")
+    uninstall.add_argument('--dry-run', action='store_true', help="print the removal waves without uninstalling")
+    restore = command('restore', cmd_restore, "restore packages from an uninstall session and/or by name")
+    restore.add_argument('--from-session', metavar='ID', help="uninstall session id (see `history`) or 'latest'")
+    restore.add_argument('--package', action='append', help="package to restore (repeatable)")
+    history = command('history', cmd_history, "list recorded uninstall sessions", devices=False)
+    history.add_argument('--limit', type=int, default=20)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.trace: tracer.enabled = True
+    sink = LogSink(echo=None if args.quiet else sys.stderr)
+    try: engine = Engine(log=sink.emit if not args.quiet else sink.file_logger.info)
+    except (OSError, ValueError, sqlite3.Error) as e: return fail(f"could not start: {e}")
+    try: return args.handler(engine, args)
+    finally:
+        if args.trace:
+            try: tracer.export(args.trace); print(tracer.format_summary(), file=sys.stderr)
+            except OSError as e: print(f"Could not write timing trace {args.trace}: {e}", file=sys.stderr)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,383 @@
+# GUI-free core of the remover: ADB access, catalog, device scans and uninstall/restore batches (no tkinter imports)
+import subprocess
+import os
+import re
+import sys
+import threading
+import json
+import shlex
+import uuid
+import logging
+import queue
+import sqlite3
+from collections import deque
+from functools import cached_property
+from logging.handlers import RotatingFileHandler
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from adb_client import AdbClient, AdbError, BATCH_SENTINEL, ShellV2Unsupported, parse_sentinel
+from catalog import load_catalog
+from planner import DependencyGraph, plan_removal
+from snapshots import SnapshotStore
+from history import HISTORY_DB_FILE, HistoryStore, session_started
+from package_info import DUMPSYS_COMMAND, parse_dumpsys_packages
+from tracing import command_type, traced, tracer
+
+# --- HELPER FUNCTION TO FIND BUNDLED FILES ---
+def resource_path(relative_path):
+    """ Get absolute path to resource, works for dev and for PyInstaller """
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+# --- CORE SETTINGS AND ADB LOGIC ---
+if sys.platform.startswith('win'):
+    ADB_PATH = resource_path(os.path.join('platform-tools', 'adb.exe'))
+else:
+    ADB_PATH = resource_path(os.path.join('platform-tools', 'adb'))
+UAD_LIST_FILE = resource_path('uad_lists.json')
+LOG_DIR = 'uninstall_logs'
+CACHE_DIR = 'cache'
+LOG_FILE, LOG_FILE_MAX_BYTES, LOG_FILE_BACKUPS = 'remover.log', 1024 * 1024, 3
+LOG_MAX_LINES = 2000
+FLEET_MAX_WORKERS = 8
+WAVE_WORKERS = 4
+LEVEL_ORDER = {'Recommended': 1, 'Advanced': 2, 'Expert': 3, 'Unsafe': 4}
+USE_NATIVE_ADB = os.environ.get('BWR_NATIVE_ADB', '1') != '0'
+adb_client = AdbClient()
+
+def adb_command(*args, serial=None):
+    """Builds an ADB command line, pinned to the given device serial when one is provided."""
+    return [ADB_PATH, '-s', serial, *args] if serial else [ADB_PATH, *args]
+
+def shell_result(code, output):
+    """Maps a device shell exit code and output onto the (output, error) contract."""
+    # Pre-Nougat shells always exit 0, so pm's own "Failure [...]" line is checked too.
+    if code != 0 or output.startswith('Failure'): return (None, output or f"exit status {code}")
+    return (output, None)
+
+def split_serial(command):
+    """Returns (serial, adb arguments) for an ADB command line, serial being None when it has no `-s`."""
+    args = list(command[1:])
+    if args[:1] == ['-s'] and len(args) > 1: return (args[1], args[2:])
+    return (None, args)
+
+def _run_native(command):
+    """Serves an ADB command line through the native client, or returns None when it has no native equivalent."""
+    serial, args = split_serial(command)
+    if args[:1] == ['shell'] and len(args) > 1: return shell_result(*adb_client.shell(serial, ' '.join(args[1:])))
+    if args == ['devices', '-l']: return (("List of devices attached\n" + adb_client.devices()).strip(), None)
+    if args == ['kill-server']: adb_client.kill_server(); return ('', None)
+    if args[:1] == ['reboot'] and len(args) <= 2:
+        adb_client.discard_shells(serial); adb_client.device_service(serial, f"reboot:{''.join(args[1:])}"); return ('', None)
+    return None
+
+def run_command(command):
+    """Executes the given ADB command and returns the result as a (output, error) tuple."""
+    if not tracer.enabled: return _run_command(command)
+    serial, args = split_serial(command)
+    with tracer.span(command_type(args[1:] if args[:1] == ['shell'] else args), 'adb', device=serial) as span:
+        result = _run_command(command, span); span.args['ok'] = result[1] is None
+        return result
+
+def _run_command(command, span=None):
+    if USE_NATIVE_ADB and command[:1] == [ADB_PATH]:
+        try:
+            result = _run_native(command)
+            if result is not None:
+                if span: span.args['transport'] = 'native'
+                return result
+        except ShellV2Unsupported: pass  # Pre-Nougat adbd: the adb binary below falls back to the old shell service
+        except AdbError as e: return (None, str(e))
+        except OSError: pass  # No ADB server listening yet; spawning adb below starts one
+    # Time spent here includes starting the adb process, which is what the separate transport label makes visible.
+    if span: span.args['transport'] = 'subprocess'
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, check=False, encoding='utf-8')
+        if result.returncode != 0: return (None, result.stderr.strip())
+        return (result.stdout.strip(), None)
+    except FileNotFoundError:
+        return (None, f"ERROR: '{ADB_PATH}' not found! Ensure 'platform-tools' is present.")
+    except Exception as e:
+        return (None, f"An unexpected error occurred: {str(e)}")
+
+# --- BATCHED SHELL EXECUTION ---
+def run_shell_batch(commands, serial=None):
+    """Streams shell commands through one `adb shell` session and yields (index, output, error) as each one finishes."""
+    results = _shell_batch(commands, serial)
+    if not tracer.enabled: return results
+    return tracer.timed_stream(results, lambda index: command_type(commands[index].split()), 'shell', device=serial)
+
+def _shell_batch(commands, serial=None):
+    finished = set()
+    if USE_NATIVE_ADB:
+        try:
+            for index, code, output in adb_client.shell_batch(serial, commands):
+                finished.add(index); yield (index, *shell_result(code, output))
+            return
+        except (OSError, AdbError) as e:
+            # Only an unreachable server or a pre-Nougat device, before any result, falls back to spawning adb (which also starts the server).
+            if finished or (isinstance(e, AdbError) and not isinstance(e, ShellV2Unsupported)):
+                for i in range(len(commands)):
+                    if i not in finished: yield (i, None, str(e) or "ADB connection lost")
+                return
+    token = f"{BATCH_SENTINEL}{uuid.uuid4().hex[:8]}"
+    script = ''.join(f"{cmd} 2>&1; echo \"{token} {i} $?\"\n" for i, cmd in enumerate(commands)) + "exit\n"
+    try:
+        proc = subprocess.Popen(adb_command('shell', serial=serial), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='replace')
+    except FileNotFoundError:
+        for i in range(len(commands)): yield (i, None, f"ERROR: '{ADB_PATH}' not found! Ensure 'platform-tools' is present.")
+        return
+    except Exception as e:
+        for i in range(len(commands)): yield (i, None, f"An unexpected error occurred: {str(e)}")
+        return
+    def feed():
+        # Written from a separate thread so a full stdout pipe can never deadlock the writer.
+        try: proc.stdin.write(script); proc.stdin.close()
+        except OSError: pass
+    threading.Thread(target=feed, daemon=True).start()
+    buffer = []
+    for line in proc.stdout:
+        line = line.rstrip('\r\n'); sentinel = parse_sentinel(line, token)
+        if sentinel is None: buffer.append(line); continue
+        tail, index, code = sentinel; buffer.append(tail)
+        output = '\n'.join(buffer).strip(); buffer = []; finished.add(index)
+        yield (index, *shell_result(code, output))
+    proc.wait()
+    leftover = '\n'.join(buffer).strip() or "adb shell session ended unexpectedly"
+    for i in range(len(commands)):
+        if i not in finished: yield (i, None, leftover)
+
+def run_shell_stream(command, parse, serial=None):
+    """Feeds one shell command's output lines to parse() while they stream in, instead of buffering it all; returns (parse's result, error)."""
+    with tracer.span(command_type(command.split()), 'adb', device=serial):
+        if USE_NATIVE_ADB:
+            status = {}
+            def native_lines(): status['code'] = yield from adb_client.shell_stream(serial, command)
+            try:
+                result = parse(native_lines())
+                return (result, None) if status.get('code', 0) == 0 else (None, f"`{command}` exited with status {status['code']}")
+            except ShellV2Unsupported: pass
+            except AdbError as e: return (None, str(e))
+            except OSError: pass  # No ADB server listening yet; spawning adb below starts one
+        try:
+            proc = subprocess.Popen(adb_command('shell', command, serial=serial), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='replace')
+        except FileNotFoundError:
+            return (None, f"ERROR: '{ADB_PATH}' not found! Ensure 'platform-tools' is present.")
+        except Exception as e:
+            return (None, f"An unexpected error occurred: {str(e)}")
+        with proc: result = parse(line.rstrip('\r\n') for line in proc.stdout)
+        return (result, None) if proc.returncode == 0 else (None, f"`{command}` exited with status {proc.returncode}")
+
+def run_shell_parallel(commands, serial=None, workers=WAVE_WORKERS):
+    """Spreads independent commands over up to `workers` concurrent shell sessions and yields (index, output, error) as each finishes."""
+    if len(commands) <= 1 or workers <= 1: yield from run_shell_batch(commands, serial); return
+    results, chunks = queue.SimpleQueue(), [list(range(len(commands)))[i::workers] for i in range(min(workers, len(commands)))]
+    def worker(indices):
+        done = set()
+        try:
+            for i, output, error in run_shell_batch([commands[j] for j in indices], serial): done.add(i); results.put((indices[i], output, error))
+        except Exception as e:
+            for i in range(len(indices)):
+                if i not in done: results.put((indices[i], None, f"An unexpected error occurred: {str(e)}"))
+    for chunk in chunks: threading.Thread(target=worker, args=(chunk,), daemon=True).start()
+    for _ in commands: yield results.get()
+
+# --- MULTI-DEVICE (FLEET) SUPPORT ---
+def list_devices():
+    """Parses `adb devices -l` into a list of dicts holding serial, state and the key:value details adb reports."""
+    output, error = run_command([ADB_PATH, 'devices', '-l'])
+    if error: return ([], error)
+    devices = []
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) < 2 or line.startswith(('List of devices', '*')): continue
+        info = dict(part.split(':', 1) for part in parts[2:] if ':' in part)
+        info.update(serial=parts[0], state=parts[1]); devices.append(info)
+    return (devices, None)
+
+def run_fleet(serials, job, *args, on_error=None):
+    """Runs job(serial, *args) for every serial on a bounded worker pool and returns the results keyed by serial.
+    A job that raises gets on_error(serial, exception) as its result, so one device cannot sink the others' results."""
+    if not serials: return {}
+    def guarded(serial):
+        try: return job(serial, *args)
+        except Exception as e:
+            if on_error is None: raise
+            return on_error(serial, e)
+    with ThreadPoolExecutor(max_workers=min(FLEET_MAX_WORKERS, len(serials))) as pool:
+        futures = {serial: pool.submit(guarded, serial) for serial in serials}
+        return {serial: future.result() for serial, future in futures.items()}
+
+
+# --- LOGGING PIPELINE ---
+class LogSink:
+    """Thread-safe log pipeline: any thread may emit, the UI drains pending lines in batches, and every record also goes to a rotating file."""
+    def __init__(self, path=LOG_FILE, max_pending=LOG_MAX_LINES, echo=None):
+        # A bounded deque is the ring buffer: if the UI falls behind, only the newest lines are kept for display.
+        self.pending, self.file_logger, self.echo = deque(maxlen=max_pending), logging.getLogger('bw_remove'), echo
+        if path and not self.file_logger.handlers:
+            try:
+                handler = RotatingFileHandler(path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(asctime)s %(message)s')); self.file_logger.addHandler(handler)
+                self.file_logger.setLevel(logging.INFO); self.file_logger.propagate = False
+            except OSError as e: print(f"Could not open log file {path}: {e}")
+    def emit(self, message):
+        line = f"[{datetime.now().strftime('%H:%M:%S')}] {message}"
+        if self.echo: print(line, file=self.echo, flush=True)
+        else: self.pending.append(line)
+        with tracer.span('write', 'log'): self.file_logger.info(message)
+    def drain(self):
+        lines = []
+        while True:
+            try: lines.append(self.pending.popleft())
+            except IndexError: return lines
+
+# --- ENGINE ---
+class Engine:
+    """Scan, uninstall and restore across one or more devices, reporting progress through `log`; the GUI and the CLI both drive this."""
+    def __init__(self, log=None, catalog=None):
+        self.log = log or (lambda message: None)
+        if not os.path.exists(LOG_DIR): os.makedirs(LOG_DIR)
+        self.catalog = catalog if catalog is not None else load_catalog(UAD_LIST_FILE, CACHE_DIR)
+        self.history = HistoryStore(os.path.join(LOG_DIR, HISTORY_DB_FILE)); self.history.import_legacy(LOG_DIR)
+        self.snapshots, self.devices, self.fleet_packages, self.installed_packages = SnapshotStore(CACHE_DIR), [], {}, {}
+        self.restorable_packages, self.package_info = {}, {}
+        # Devices whose last scan failed: their empty fleet_packages entry says nothing about what is installed.
+        self.failed_scans = set()
+    @cached_property
+    def dependency_graph(self): return DependencyGraph(self.catalog)  # Built on first use; a plain scan never needs it
+    def device_prefix(self, serial): return f"[{serial}] " if serial and len(self.devices) > 1 else ""
+    def device_failed(self, fallback):
+        """An on_error for run_fleet: logs the device's exception and returns fallback(serial, message) as its result."""
+        def failed(serial, exception):
+            message = f"An unexpected error occurred: {str(exception)}"
+            self.log(f"{self.device_prefix(serial)}Error: {message}"); return fallback(serial, message)
+        return failed
+    def refresh_devices(self):
+        """Re-reads the attached devices; returns (all devices, error) and keeps the ready ones in self.devices."""
+        devices, error = list_devices()
+        if error: return ([], error)
+        self.devices = [d for d in devices if d['state'] == 'device']
+        return (devices, None)
+    @traced('device')
+    def scan_device(self, serial):
+        installed, error = run_command(adb_command('shell', 'pm', 'list', 'packages', serial=serial))
+        if error: self.log(f"{self.device_prefix(serial)}Error: {error}"); self.failed_scans.add(serial); return set()
+        installed_set = {line.replace('package:', '') for line in installed.splitlines()}; self.installed_packages[serial] = installed_set
+        changes, previous = self.snapshots.update(serial, installed_set), None if serial in self.failed_scans else self.fleet_packages.get(serial)
+        self.failed_scans.discard(serial)
+        if changes is not None and previous is not None:
+            # Only packages that appeared since the last scan need a catalog lookup.
+            added, removed = changes
+            detected = (previous - removed) | {pkg for pkg in added if pkg in self.catalog}
+        else: detected = installed_set.intersection(self.catalog.keys())
+        if changes is not None: self.log(f"{self.device_prefix(serial)}{len(changes[0])} package(s) added, {len(changes[1])} removed since the last scan.")
+        if self.device_prefix(serial): self.log(f"{self.device_prefix(serial)}Found {len(detected)} potential bloatware app(s).")
+        self.refresh_package_info(serial)
+        return detected
+    def refresh_package_info(self, serial):
+        """Re-reads a device's per-package records in one streamed dumpsys. Every scan does this, since an app update or
+        enable/disable leaves the package list unchanged; list rebuilds after a batch reuse the records kept here."""
+        cached = self.package_info.get(serial)
+        records, error = run_shell_stream(DUMPSYS_COMMAND, parse_dumpsys_packages, serial)
+        if error: self.log(f"{self.device_prefix(serial)}Could not read package details: {error}"); return cached or {}
+        self.package_info[serial] = records
+        return records
+    def package_details(self, pkg):
+        """The PackageInfo record for pkg from the first scanned device (in serial order) that has one, or None."""
+        for serial in sorted(self.package_info, key=str):
+            if (info := self.package_info[serial].get(pkg)): return info
+        return None
+    def scan(self, serials=(None,)):
+        """Scans every serial concurrently and returns the sorted union of known bloatware found."""
+        def failed(serial, message): self.failed_scans.add(serial); return set()
+        self.fleet_packages = run_fleet(list(serials), self.scan_device, on_error=self.device_failed(failed))
+        return sorted(set().union(*self.fleet_packages.values()))
+    def plan(self, selection):
+        """Orders a selection into removal waves against everything the last scan found installed."""
+        return plan_removal(self.dependency_graph, selection, set().union(*self.installed_packages.values()))
+    @traced('device')
+    def uninstall_device(self, serial, waves, timestamp):
+        waves, prefix = self.device_waves(serial, waves), self.device_prefix(serial)
+        self.log(f"{prefix}Starting uninstall process for {sum(map(len, waves))} app(s) in {len(waves)} wave(s)...")
+        log_filename = os.path.join(LOG_DIR, f"uninstall_{timestamp}_{re.sub(r'[^A-Za-z0-9._-]', '_', serial)}.json" if serial else f"uninstall_{timestamp}.json")
+        uninstalled_packages_in_session, results = [], []
+        # Waves run strictly in order (dependents before what they need); packages inside a wave are independent.
+        for wave in waves:
+            for index, _, error in run_shell_parallel([f"pm uninstall -k --user 0 {shlex.quote(pkg)}" for pkg in wave], serial=serial):
+                pkg = wave[index]
+                results.append((pkg, 'failed' if error else 'ok', error))
+                if error: self.log(f"{prefix}-> FAILED to uninstall {pkg}: {error}")
+                else: self.log(f"{prefix}-> Successfully uninstalled {pkg}"); uninstalled_packages_in_session.append(pkg)
+        session_file = None
+        if uninstalled_packages_in_session:
+            try:
+                with open(log_filename, 'w') as f: json.dump(uninstalled_packages_in_session, f, indent=2)
+                session_file = os.path.basename(log_filename); self.log(f"{prefix}Uninstall session saved to {log_filename}")
+            except OSError as e: self.log(f"{prefix}Could not save uninstall session: {e}")
+        try: self.history.record_session('uninstall', session_started(timestamp), serial, results, session_file)
+        except sqlite3.Error as e: self.log(f"{prefix}Could not record uninstall history: {e}")
+        self.record_package_changes(serial, removed=uninstalled_packages_in_session)
+        return results
+    def device_waves(self, serial, waves):
+        """The non-empty waves restricted, in fleet mode, to the packages the scan actually found on this device."""
+        if serial in self.fleet_packages: waves = [[pkg for pkg in wave if pkg in self.fleet_packages[serial]] for wave in waves]
+        return [wave for wave in waves if wave]
+    def uninstall(self, waves, serials=(None,)):
+        """Runs the waves on every serial; returns {serial: [(package, 'ok' | 'failed', error), ...]}."""
+        failed = self.device_failed(lambda serial, message: [(pkg, 'failed', message) for wave in self.device_waves(serial, waves) for pkg in wave])
+        return run_fleet(list(serials), self.uninstall_device, waves, datetime.now().strftime("%Y-%m-%d_%H-%M-%S"), on_error=failed)
+    @traced('device')
+    def scan_restorable_device(self, serial):
+        """Packages removed for user 0 but still on the device: the `-u` list minus the installed one, both fetched at once."""
+        lists = {}
+        for index, output, error in run_shell_parallel(['pm list packages', 'pm list packages -u'], serial=serial, workers=2):
+            if error: self.log(f"{self.device_prefix(serial)}Error: {error}"); self.restorable_packages.pop(serial, None); return set()
+            lists[index] = {line.replace('package:', '') for line in output.splitlines()}
+        self.installed_packages[serial], self.restorable_packages[serial] = lists[0], lists[1] - lists[0]
+        return self.restorable_packages[serial]
+    def scan_restorable(self, serials=(None,)):
+        def failed(serial, message): self.restorable_packages.pop(serial, None); return set()
+        return sorted(set().union(*run_fleet(list(serials), self.scan_restorable_device, on_error=self.device_failed(failed)).values()))
+    @traced('device')
+    def restore_device(self, serial, packages):
+        packages, prefix = self.device_restorable(serial, packages), self.device_prefix(serial)
+        self.log(f"{prefix}Starting restore process for {len(packages)} app(s)...")
+        restored, results = [], []
+        for index, _, error in run_shell_batch([f"cmd package install-existing {shlex.quote(pkg)}" for pkg in packages], serial=serial):
+            pkg = packages[index]; results.append((pkg, 'failed' if error else 'ok', error))
+            if error: self.log(f"{prefix}-> FAILED to restore {pkg}: {error}")
+            else: self.log(f"{prefix}-> Successfully restored {pkg}"); restored.append(pkg)
+        try: self.history.record_session('restore', datetime.now().strftime("%Y-%m-%d %H:%M:%S"), serial, results)
+        except sqlite3.Error as e: self.log(f"{prefix}Could not record restore history: {e}")
+        self.record_package_changes(serial, added=restored)
+        return results
+    def device_restorable(self, serial, packages):
+        """After a restore scan only the packages it found removed on this device are sent to it."""
+        return [pkg for pkg in packages if pkg in self.restorable_packages[serial]] if serial in self.restorable_packages else list(packages)
+    def restore(self, packages, serials=(None,)):
+        """Re-enables packages on every serial; returns {serial: [(package, 'ok' | 'failed', error), ...]}."""
+        failed = self.device_failed(lambda serial, message: [(pkg, 'failed', message) for pkg in self.device_restorable(serial, packages)])
+        return run_fleet(list(serials), self.restore_device, list(packages), on_error=failed)
+    def record_package_changes(self, serial, added=(), removed=()):
+        """Applies a batch's outcome to the device snapshot and the in-memory scan results, so no rescan is needed to see it."""
+        self.snapshots.apply(serial, added=added, removed=removed)
+        added, removed = set(added), set(removed)
+        if serial in self.installed_packages: self.installed_packages[serial] = (self.installed_packages[serial] - removed) | added
+        if serial in self.fleet_packages: self.fleet_packages[serial] = (self.fleet_packages[serial] - removed) | {pkg for pkg in added if pkg in self.catalog}
+        if serial in self.restorable_packages: self.restorable_packages[serial] = (self.restorable_packages[serial] - added) | removed
+    def reboot(self, mode, serial=None): return run_command(adb_command(*mode.split(), serial=serial))
+    def export_trace(self):
+        """Writes the timing spans recorded so far to LOG_DIR as a Chrome trace and returns (path, summary table)."""
+        path = tracer.export(os.path.join(LOG_DIR, f"trace_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"))
+        return (path, tracer.format_summary())
+
+def fleet_summary(action, results):
+    """One-line totals for a fleet result, followed by a line per device when there was more than one."""
+    counts = {serial: (sum(1 for r in rows if r[1] == 'ok'), sum(1 for r in rows if r[1] != 'ok')) for serial, rows in results.items()}
+    summary = f"{action} complete. Successful: {sum(c[0] for c in counts.values())}, Failed: {sum(c[1] for c in counts.values())}."
+    if len(counts) > 1: summary += "\n" + "\n".join(f"{serial}: {c[0]} ok, {c[1]} failed" for serial, c in sorted(counts.items()))
+    return summary
@@ -0,0 +1,180 @@
+# In-process stand-in for an ADB server and its devices, for benchmarking without hardware
+import argparse
+import json
+import random
+import re
+import shlex
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+# Matches one line of the sentinel-delimited scripts that ShellSession.run_batch writes to the device shell.
+SCRIPT_LINE = re.compile(r'^(.*) 2>&1; echo "(\S+) (\d+) \$\?"$')
+ID_STDIN, ID_STDOUT, ID_EXIT = 0, 1, 3
+PACKET_SIZE = 64 * 1024
+DEFAULT_FEATURES = ('shell_v2', 'cmd', 'stat_v2', 'ls_v2', 'apex')
+
+def synthetic_packages(count, seed=0, include=()):
+    """`include` plus made-up vendor package names, `count` in total (or all of `include` if that is more)."""
+    packages, rng = list(dict.fromkeys(include)), random.Random(seed)
+    vendors = [f"com.{rng.choice(['acme', 'vendor', 'oem', 'carrier', 'partner'])}{i}" for i in range(max(1, count // 20))]
+    while len(packages) < count: packages.append(f"{rng.choice(vendors)}.app{len(packages)}")
+    return packages
+
+class FakeDevice:
+    """One simulated device: a package universe, the subset installed for user 0, per-command latency and random failures.
+    Leaving `shell_v2` out of `features` makes it behave like a pre-Nougat adbd."""
+    def __init__(self, serial, packages, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0, features=DEFAULT_FEATURES):
+        self.serial, self.packages, self.latency, self.jitter, self.failure_rate = serial, list(packages), latency, jitter, failure_rate
+        self.features = tuple(features)
+        self.seed, self._lock = seed, threading.Lock(); self.reset()
+    def reset(self):
+        with self._lock: self.installed, self.rng, self.commands = set(self.packages), random.Random(self.seed), 0
+    def _delay(self):
+        with self._lock: self.commands += 1; delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay: time.sleep(delay)
+    def _fails(self):
+        with self._lock: return self.rng.random() < self.failure_rate
+    def execute(self, command):
+        """Runs one shell command line and returns (exit_code, output)."""
+        self._delay()
+        try: argv = shlex.split(command)
+        except ValueError as e: return (2, f"/system/bin/sh: syntax error: {e}")
+        if argv[:3] == ['pm', 'list', 'packages']:
+            with self._lock: listed = self.packages if '-u' in argv[3:] else [pkg for pkg in self.packages if pkg in self.installed]
+            return (0, '\n'.join(f"package:{pkg}" for pkg in listed))
+        if argv[:3] == ['dumpsys', 'package', 'packages']: return (0, self.dumpsys())
+        if argv[:2] == ['pm', 'uninstall'] and len(argv) > 2:
+            pkg = argv[-1]
+            if self._fails(): return (1, "Failure [DELETE_FAILED_INTERNAL_ERROR]")
+            with self._lock:
+                if pkg not in self.installed: return (1, "Failure [not installed for 0]")
+                self.installed.discard(pkg)
+            return (0, "Success")
+        if argv[:3] == ['cmd', 'package', 'install-existing'] and len(argv) > 3:
+            pkg = argv[-1]
+            if self._fails(): return (1, f"Failure [INSTALL_FAILED_INTERNAL_ERROR] {pkg}")
+            with self._lock:
+                if pkg not in self.packages: return (1, f"Package {pkg} doesn't exist")
+                self.installed.add(pkg)
+            return (0, f"Package {pkg} installed for user: 0")
+        return (127, f"/system/bin/sh: {argv[0] if argv else ''}: inaccessible or not found")
+
+    def dumpsys(self):
+        """A `dumpsys package packages` listing in the layout of recent Android releases; every third package is a system app
+        and every seventeenth is disabled for user 0."""
+        with self._lock: installed = set(self.installed)
+        lines = ["Packages:"]
+        for i, pkg in enumerate(self.packages):
+            system = i % 3 == 0
+            lines += [f"  Package [{pkg}] ({i:08x}):", f"    userId={10000 + i}", f"    codePath={'/system/app/' if system else '/data/app/~~fake==/'}{pkg}",
+                      f"    versionCode={1000 + i} minSdk=29 targetSdk=33", f"    versionName=1.{i % 10}.{i}",
+                      f"    flags=[ {'SYSTEM ' if system else ''}HAS_CODE ALLOW_CLEAR_USER_DATA ]",
+                      f"    User 0: ceDataInode={i} installed={str(pkg in installed).lower()} hidden=false suspended=false stopped=false notLaunched=false enabled={3 if i % 17 == 0 else 0} instant=false virtual=false"]
+        return '\n'.join(lines + ["", "Hidden system packages:"])
+
+class _Handler(socketserver.BaseRequestHandler):
+    def setup(self):
+        with self.server.lock: self.server.connections.add(self.request)
+    def finish(self):
+        with self.server.lock: self.server.connections.discard(self.request)
+    def _read(self, size):
+        chunks = []
+        while size:
+            chunk = self.request.recv(size)
+            if not chunk: raise EOFError
+            chunks.append(chunk); size -= len(chunk)
+        return b''.join(chunks)
+    def _request(self): return self._read(int(self._read(4), 16)).decode('utf-8')
+    def _okay(self, payload=None):
+        self.request.sendall(b'OKAY' + (b'%04x' % len(payload) + payload if payload is not None else b''))
+    def _fail(self, message):
+        payload = message.encode('utf-8'); self.request.sendall(b'FAIL' + b'%04x' % len(payload) + payload)
+    def handle(self):
+        server, device = self.server, None
+        try:
+            while True:
+                service = self._request()
+                if service in ('host:devices', 'host:devices-l'):
+                    self._okay(''.join(f"{serial}\tdevice product:fake model:Fake_{i} device:fake transport_id:{i + 1}\n" for i, serial in enumerate(server.devices)).encode('utf-8')); return
+                if service == 'host:kill': self._okay(); return
+                if service == 'host:features' or (service.startswith('host-serial:') and service.endswith(':features')):
+                    serial = service[len('host-serial:'):-len(':features')] if service.startswith('host-serial:') else next(iter(server.devices), None)
+                    if serial not in server.devices: self._fail(f"device '{serial}' not found"); return
+                    self._okay(','.join(server.devices[serial].features).encode('utf-8')); return
+                if service.startswith('host:transport'):
+                    serial = service.partition('host:transport:')[2] or next(iter(server.devices), None)
+                    if serial not in server.devices: self._fail(f"device '{serial}' not found"); return
+                    device = server.devices[serial]; self._okay(); continue
+                if device is None: self._fail(f"unknown host service '{service}'"); return
+                if service.startswith('reboot:'): self._okay(); return
+                if service.startswith('shell,v2'):
+                    if 'shell_v2' not in device.features: self._fail("closed"); return
+                    self._okay(); self._shell(device); return
+                self._fail(f"unsupported service '{service}'"); return
+        except (EOFError, OSError): return
+    def _shell(self, device):
+        pending = b''
+        while True:
+            packet_id, length = struct.unpack('<BI', self._read(5))
+            data = self._read(length) if length else b''
+            if packet_id != ID_STDIN: continue
+            *lines, pending = (pending + data).split(b'\n')
+            for line in lines:
+                line = line.decode('utf-8', 'replace').rstrip('\r')
+                if line.strip() == 'exit': self.request.sendall(struct.pack('<BI', ID_EXIT, 1) + b'\0'); return
+                match = SCRIPT_LINE.match(line)
+                if not match: code, output, token, index = device.execute(line) + (None, None)
+                else: code, output = device.execute(match.group(1)); token, index = match.group(2), match.group(3)
+                out = ((output + '\n' if output else '') + (f"{token} {index} {code}\n" if token else '')).encode('utf-8')
+                for start in range(0, len(out), PACKET_SIZE):
+                    self.request.sendall(struct.pack('<BI', ID_STDOUT, len(out[start:start + PACKET_SIZE])) + out[start:start + PACKET_SIZE])
+
+class FakeAdbServer(socketserver.ThreadingTCPServer):
+    """Speaks enough of the ADB server protocol (devices, transport, shell v2, reboot) for AdbClient to drive fake devices."""
+    daemon_threads, allow_reuse_address = True, True
+    def __init__(self, devices, host='127.0.0.1', port=0):
+        self.devices, self.connections, self.lock = {device.serial: device for device in devices}, set(), threading.Lock()
+        super().__init__((host, port), _Handler)
+    @property
+    def port(self): return self.server_address[1]
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start(); return self
+    def stop(self): self.shutdown(); self.server_close()
+    def reset(self):
+        for device in self.devices.values(): device.reset()
+    def drop_connections(self):
+        """Closes every open client socket from the server side, as a device reboot or replug does."""
+        with self.lock: connections = list(self.connections)
+        for sock in connections:
+            try: sock.shutdown(socket.SHUT_RDWR)
+            except OSError: pass
+
+def make_fleet(count=1, packages=5000, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0, include=()):
+    """`count` fake devices sharing one synthetic package universe (which always holds everything in `include`)."""
+    universe = synthetic_packages(packages, seed, include)
+    return [FakeDevice(f"FAKE{i:04d}", universe, latency, jitter, failure_rate, seed + i) for i in range(count)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve fake devices on the ADB server port, for running the remover without hardware.")
+    parser.add_argument('--port', type=int, default=5037)
+    parser.add_argument('--devices', type=int, default=1)
+    parser.add_argument('--packages', type=int, default=5000, help="installed packages per device")
+    parser.add_argument('--latency-ms', type=float, default=5.0, help="device-side time per shell command")
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="chance that an uninstall / restore fails")
+    parser.add_argument('--catalog', help="uad_lists.json whose packages are always installed")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    include = ()
+    if args.catalog:
+        with open(args.catalog, 'r', encoding='utf-8') as f: include = [entry['id'] for entry in json.load(f)]
+    server = FakeAdbServer(make_fleet(args.devices, args.packages, args.latency_ms / 1000, args.jitter_ms / 1000, args.failure_rate, args.seed, include), port=args.port)
+    print(f"Fake ADB server with {args.devices} device(s) on port {server.port}")
+    try: server.serve_forever()
+    except KeyboardInterrupt: server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Indexed uninstall/restore history (SQLite), replacing full re-reads of every session JSON
+import json
+import os
+import re
+import sqlite3
+import threading
+
+HISTORY_DB_FILE = 'history.sqlite3'
+# Bound parameters per IN (...) query; older SQLite builds cap a statement at 999.
+QUERY_CHUNK = 500
+LEGACY_LOG_PATTERN = re.compile(r'^uninstall_(\d{4}-\d{2}-\d{2})_(\d{2})-(\d{2})-(\d{2})(?:_(.+))?\.json$')
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (id INTEGER PRIMARY KEY, kind TEXT NOT NULL, started TEXT NOT NULL, serial TEXT, log_file TEXT UNIQUE, succeeded INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS events (session_id INTEGER NOT NULL REFERENCES sessions(id), package TEXT NOT NULL, outcome TEXT NOT NULL, error TEXT);
+CREATE INDEX IF NOT EXISTS sessions_by_kind_started ON sessions(kind, started);
+CREATE INDEX IF NOT EXISTS events_by_session ON events(session_id);
+CREATE INDEX IF NOT EXISTS events_by_package ON events(package);
+"""
+
+def session_started(timestamp):
+    """Turns the "%Y-%m-%d_%H-%M-%S" stamp used in session file names into a sortable "%Y-%m-%d %H:%M:%S"."""
+    date, time = timestamp.split('_', 1)
+    return f"{date} {time.replace('-', ':')}"
+
+class HistoryStore:
+    """Append-only record of every uninstall/restore session and per-package outcome, indexed by time and by package."""
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self.db: self.db.executescript(SCHEMA)
+    def close(self):
+        with self._lock: self.db.close()
+    def record_session(self, kind, started, serial, results, log_file=None):
+        """Stores one session; results is a list of (package, outcome, error) with outcome 'ok' or 'failed'."""
+        with self._lock, self.db:
+            cursor = self.db.execute("INSERT INTO sessions (kind, started, serial, log_file, succeeded) VALUES (?, ?, ?, ?, ?)",
+                                     (kind, started, serial, log_file, sum(1 for _, outcome, _ in results if outcome == 'ok')))
+            self.db.executemany("INSERT INTO events (session_id, package, outcome, error) VALUES (?, ?, ?, ?)", [(cursor.lastrowid, *result) for result in results])
+            return cursor.lastrowid
+    def import_legacy(self, log_dir):
+        """Imports uninstall_*.json session files written before the store existed; files already known are skipped unopened."""
+        try: names = [name for name in os.listdir(log_dir) if LEGACY_LOG_PATTERN.match(name)]
+        except OSError: return 0
+        with self._lock: known = {row[0] for row in self.db.execute("SELECT log_file FROM sessions WHERE log_file IS NOT NULL")}
+        imported = 0
+        for name in sorted(set(names) - known):
+            date, hours, minutes, seconds, serial = LEGACY_LOG_PATTERN.match(name).groups()
+            try:
+                with open(os.path.join(log_dir, name), 'r') as f: packages = json.load(f)
+            except (OSError, ValueError): continue
+            self.record_session('uninstall', f"{date} {hours}:{minutes}:{seconds}", serial, [(pkg, 'ok', None) for pkg in packages], log_file=name); imported += 1
+        return imported
+    def session_count(self, kind='uninstall'):
+        with self._lock: return self.db.execute("SELECT COUNT(*) FROM sessions WHERE kind = ? AND succeeded > 0", (kind,)).fetchone()[0]
+    def sessions(self, offset=0, limit=100, kind='uninstall'):
+        """One page of sessions that changed something, newest first, as (id, started, serial, succeeded) rows."""
+        with self._lock:
+            return self.db.execute("SELECT id, started, serial, succeeded FROM sessions WHERE kind = ? AND succeeded > 0 ORDER BY started DESC, id DESC LIMIT ? OFFSET ?", (kind, limit, offset)).fetchall()
+    def session(self, session_id):
+        """A single session as an (id, kind, started, serial, succeeded) row, or None."""
+        with self._lock: return self.db.execute("SELECT id, kind, started, serial, succeeded FROM sessions WHERE id = ?", (session_id,)).fetchone()
+    def session_packages(self, session_id, outcome='ok'):
+        with self._lock: return [row[0] for row in self.db.execute("SELECT package FROM events WHERE session_id = ? AND outcome = ? ORDER BY package", (session_id, outcome))]
+    def last_uninstalled(self, packages):
+        """{package: (started, serial)} for the latest successful uninstall of each of `packages` that has one."""
+        packages, rows = sorted(set(packages)), []
+        with self._lock:
+            # Looked up through events_by_package, a chunk at a time, rather than grouping the whole event table.
+            for start in range(0, len(packages), QUERY_CHUNK):
+                chunk = packages[start:start + QUERY_CHUNK]
+                rows += self.db.execute(f"SELECT e.package, MAX(s.started), s.serial FROM events e JOIN sessions s ON s.id = e.session_id "
+                                        f"WHERE e.package IN ({', '.join('?' * len(chunk))}) AND s.kind = 'uninstall' AND e.outcome = 'ok' GROUP BY e.package", chunk).fetchall()
+        return {pkg: (started, serial) for pkg, started, serial in rows}
+    def package_history(self, package):
+        """Every recorded action on a package as (started, kind, serial, outcome) rows, newest first."""
+        with self._lock:
+            return self.db.execute("SELECT s.started, s.kind, s.serial, e.outcome FROM events e JOIN sessions s ON s.id = e.session_id WHERE e.package = ? ORDER BY s.started DESC", (package,)).fetchall()
@@ -0,0 +1,33 @@
+# Per-package metadata (version, enabled state, system flag, install location) parsed from one streamed `dumpsys package`
+import re
+from collections import namedtuple
+
+DUMPSYS_COMMAND = 'dumpsys package packages'
+PackageInfo = namedtuple('PackageInfo', ['version', 'version_code', 'enabled', 'system', 'location'])
+USER_0_ENABLED = re.compile(r'User 0:.*\benabled=(\d+)')
+# PackageManager COMPONENT_ENABLED_STATE_*: 0 default and 1 enabled; 2 disabled, 3 disabled by user, 4 disabled until used.
+ENABLED_STATES = ('0', '1')
+# A real dump runs to dozens of fields per package; anything not starting like one of these is dropped after one slice and set lookup.
+FIELD_PREFIXES = frozenset(('Pack', 'vers', 'flag', 'pkgF', 'code', 'User'))
+
+def parse_dumpsys_packages(lines):
+    """Folds `dumpsys package packages` output, consumed line by line as it streams in, into {package: PackageInfo}.
+    Only the "Packages:" section is read; the hidden (pre-update) system copies listed after it are skipped."""
+    records, in_packages, current = {}, False, None
+    for line in lines:
+        if not line: continue
+        if not line[0].isspace():
+            in_packages = line.startswith('Packages:'); continue
+        if not in_packages: continue
+        field = line.lstrip(); prefix = field[:4]
+        if prefix not in FIELD_PREFIXES: continue
+        if field.startswith('Package ['):
+            pkg = field[9:field.find(']')]; current = records[pkg] = ['', -1, True, False, '']
+        elif current is None: continue
+        elif field.startswith('versionName='): current[0] = field[12:]
+        elif field.startswith('versionCode='):
+            code = field[12:].split(' ', 1)[0]; current[1] = int(code) if code.isdigit() else -1
+        elif prefix in ('flag', 'pkgF') and field.startswith(('flags=[', 'pkgFlags=[')): current[3] = current[3] or ' SYSTEM ' in field
+        elif field.startswith('codePath=/'): current[4] = field[10:].split('/', 1)[0]
+        elif prefix == 'User' and (enabled := USER_0_ENABLED.match(field)): current[2] = enabled.group(1) in ENABLED_STATES
+    return {pkg: PackageInfo(*fields) for pkg, fields in records.items()}
@@ -0,0 +1,82 @@
+# Model / virtualized view pair behind the uninstall and restore package lists
+from tkinter import ttk
+
+class PackageListModel:
+    """Owns a package list's rows, check state, filter and sort order, independent of any widget."""
+    def __init__(self, checked, columns, sort_keys=None):
+        self.checked, self.columns, self.sort_keys = checked, columns, sort_keys or {}
+        self.items, self.filtered, self.visible = [], None, []
+        self.sort_column, self.sort_reverse, self._orders = None, False, {}
+    def set_items(self, items):
+        self.items, self.filtered, self._orders = items, None, {}; self._update()
+    def set_filter(self, rows):
+        self.filtered = rows; self._update()
+    def sort(self, column, reverse=False):
+        self.sort_column, self.sort_reverse = column, reverse; self._update()
+    def _order(self):
+        if self.sort_column is None: return range(len(self.items))
+        cache_key = (self.sort_column, self.sort_reverse)
+        if cache_key not in self._orders:
+            # Keys are computed once per column per item set; re-sorting or re-filtering only reuses the permutation.
+            index, key = self.columns[self.sort_column], self.sort_keys.get(self.sort_column, lambda value: value)
+            keys = [key(item[index]) for item in self.items]
+            self._orders[cache_key] = sorted(range(len(self.items)), key=keys.__getitem__, reverse=self.sort_reverse)
+        return self._orders[cache_key]
+    def _update(self):
+        order = self._order()
+        if self.filtered is None: self.visible = list(order)
+        elif self.sort_column is None: self.visible = list(self.filtered)
+        else: keep = set(self.filtered); self.visible = [row for row in order if row in keep]
+    def package(self, row): return self.items[row][1]
+    def is_checked(self, row): return self.items[row][1] in self.checked
+    def toggle(self, row):
+        pkg = self.items[row][1]
+        if pkg in self.checked: self.checked.remove(pkg)
+        else: self.checked.add(pkg)
+
+class VirtualTreeView:
+    """Drives a ttk.Treeview as a window onto a PackageListModel: only the rows that fit on screen exist as Tk items,
+    and a refresh rewrites just the slots whose rendered values changed."""
+    def __init__(self, tree, scrollbar, model, render, on_scroll=None):
+        self.tree, self.scrollbar, self.model, self.render, self.on_scroll = tree, scrollbar, model, render, on_scroll
+        self.offset, self.slots, self.rendered = 0, [], []
+        scrollbar.config(command=self.yview); tree.configure(yscrollcommand='')
+        tree.bind('<Configure>', self._on_resize, add='+')
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'): tree.bind(sequence, self._on_wheel)
+    def _capacity(self):
+        row_height = int(ttk.Style(self.tree).lookup('Treeview', 'rowheight') or 20)
+        # One row's worth of pixels is left for the heading so the last slot is never half hidden.
+        return max(1, self.tree.winfo_height() // row_height - 1)
+    def _on_resize(self, event=None):
+        capacity = self._capacity()
+        while len(self.slots) < capacity:
+            self.slots.append(self.tree.insert('', 'end', iid=f"slot{len(self.slots)}")); self.tree.detach(self.slots[-1]); self.rendered.append(None)
+        while len(self.slots) > capacity: self.tree.delete(self.slots.pop()); self.rendered.pop()
+        self.refresh()
+    def _on_wheel(self, event):
+        self.yview('scroll', -3 if event.num == 4 or event.delta > 0 else 3, 'units'); return 'break'
+    def yview(self, *args):
+        if args[0] == 'moveto': self.offset = int(float(args[1]) * len(self.model.visible))
+        elif args[0] == 'scroll': self.offset += int(args[1]) * (max(1, len(self.slots) - 1) if args[2] == 'pages' else 1)
+        self.tree.selection_set(())
+        if self.on_scroll: self.on_scroll()
+        self.refresh()
+    def refresh(self):
+        total, capacity = len(self.model.visible), len(self.slots)
+        self.offset = max(0, min(self.offset, total - capacity))
+        rows = self.model.visible[self.offset:self.offset + capacity]
+        for position, slot in enumerate(self.slots):
+            wanted = self.render(self.model.items[rows[position]], self.model.is_checked(rows[position])) if position < len(rows) else None
+            if wanted == self.rendered[position]: continue
+            if wanted is None: self.tree.detach(slot)
+            else:
+                if self.rendered[position] is None: self.tree.move(slot, '', position)
+                self.tree.item(slot, values=wanted[0], tags=wanted[1])
+            self.rendered[position] = wanted
+        self.tree.yview_moveto(0)
+        self.scrollbar.set(*((self.offset / total, min(1.0, (self.offset + capacity) / total)) if total else (0.0, 1.0)))
+    def row_at(self, slot):
+        """Maps a Treeview item id (as returned by identify_row) back to its model row, or None."""
+        if slot not in self.slots: return None
+        position = self.offset + self.slots.index(slot)
+        return self.model.visible[position] if position < len(self.model.visible) else None
@@ -0,0 +1,45 @@
+# Dependency-aware removal planning over the catalog's dependencies / neededBy fields
+from collections import deque, namedtuple
+
+RemovalPlan = namedtuple('RemovalPlan', ['waves', 'at_risk'])
+
+class DependencyGraph:
+    """Indexed package graph built once per catalog: needs[a] holds what a depends on, needed_by[b] what depends on b."""
+    def __init__(self, catalog):
+        self.needs, self.needed_by = {}, {}
+        # Either side of a link may be declared on only one of the two entries, so both fields are folded in.
+        for links, forward in ((catalog.dependencies, True), (catalog.needed_by, False)):
+            for row, others in links.items():
+                pkg = catalog.ids[row]
+                for other in others: self.add_edge(pkg, other) if forward else self.add_edge(other, pkg)
+    def add_edge(self, dependent, dependency):
+        self.needs.setdefault(dependent, set()).add(dependency); self.needed_by.setdefault(dependency, set()).add(dependent)
+    def dependents_closure(self, packages):
+        """Every package that transitively needs one of `packages` (excluding them), found in O(V+E)."""
+        seen, queue = set(packages), deque(packages)
+        while queue:
+            for dependent in self.needed_by.get(queue.popleft(), ()):
+                if dependent not in seen: seen.add(dependent); queue.append(dependent)
+        return seen - set(packages)
+    def waves(self, packages):
+        """Splits packages into removal waves: a package only goes once everything in the set that needs it has gone."""
+        packages = set(packages)
+        blockers = {pkg: len(self.needed_by.get(pkg, set()) & packages) for pkg in packages}
+        wave, waves = sorted(pkg for pkg, count in blockers.items() if not count), []
+        while wave:
+            waves.append(wave); following = set()
+            for pkg in wave:
+                for dependency in self.needs.get(pkg, ()):
+                    if dependency in blockers:
+                        blockers[dependency] -= 1
+                        if not blockers[dependency]: following.add(dependency)
+            wave = sorted(following)
+        leftover = sorted(pkg for pkg, count in blockers.items() if count > 0)
+        if leftover: waves.append(leftover)  # Dependency cycle: nothing left to order by, remove them together last
+        return waves
+
+def plan_removal(graph, selection, installed):
+    """Orders the selection into waves and reports installed, unselected packages that depend on it (each with what it needs)."""
+    selection = set(selection); closure = graph.dependents_closure(selection); affected = selection | closure
+    at_risk = {dependent: sorted(graph.needs[dependent] & affected) for dependent in sorted(closure & set(installed))}
+    return RemovalPlan(graph.waves(selection), at_risk)
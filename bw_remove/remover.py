@@ -1,41 +1,44 @@
 # Step 1: Import necessary libraries
-import subprocess
 import os
 import sys
 import threading
 import json
+import sqlite3
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-from datetime import datetime
+from catalog import Catalog, load_catalog
+from search import SearchIndex
+from package_view import PackageListModel, VirtualTreeView
+from engine import ADB_PATH, UAD_LIST_FILE, CACHE_DIR, LOG_MAX_LINES, LEVEL_ORDER, Engine, LogSink, fleet_summary, run_command
+from tracing import traced, tracer
 
-# --- HELPER FUNCTION TO FIND BUNDLED FILES ---
-def resource_path(relative_path):
-    """ Get absolute path to resource, works for dev and for PyInstaller """
-    try:
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
-
-# --- CORE SETTINGS AND ADB LOGIC ---
-if sys.platform.startswith('win'):
-    ADB_PATH = resource_path(os.path.join('platform-tools', 'adb.exe'))
-else:
-    ADB_PATH = resource_path(os.path.join('platform-tools', 'adb'))
-UAD_LIST_FILE = resource_path('uad_lists.json')
-LOG_DIR = 'uninstall_logs'
+# --- GUI SETTINGS ---
 CONFIG_FILE = 'config.json'
+LOG_FLUSH_MS = 100
+HISTORY_PAGE_SIZE = 100
+SEARCH_DEBOUNCE_MS = 150
 
-def run_command(command):
-    """Executes the given ADB command and returns the result as a (output, error) tuple."""
-    try:
-        result = subprocess.run(command, capture_output=True, text=True, check=False, encoding='utf-8')
-        if result.returncode != 0: return (None, result.stderr.strip())
-        return (result.stdout.strip(), None)
-    except FileNotFoundError:
-        return (None, f"ERROR: '{ADB_PATH}' not found! Ensure 'platform-tools' is present.")
-    except Exception as e:
-        return (None, f"An unexpected error occurred: {str(e)}")
+def item_search_text(item):
+    """Package id plus description (when the row has one), separated so a query never matches across the two."""
+    return item[1] + ('\0' + item[3] if len(item) > 3 else '')
+
+# Uninstall rows are (check, package, level, description, version, state, type, location, version code); the tree shows
+# the description last and sorts the Version column on the numeric code.
+UNINSTALL_TREE_COLUMNS = ("Select", "Package", "Level", "Version", "State", "Type", "Location", "Description")
+# Treeview's identify_column id ("#1" is the first column) of the description, which shows the full text as a tooltip.
+DESCRIPTION_COLUMN_ID = f"#{UNINSTALL_TREE_COLUMNS.index('Description') + 1}"
+UNINSTALL_COLUMNS = {"Package": 1, "Level": 2, "Description": 3, "Version": 8, "State": 5, "Type": 6, "Location": 7}
+UNINSTALL_SORT_KEYS = {"Level": lambda level: LEVEL_ORDER.get(level, 0)}
+RESTORE_COLUMNS = {"Package": 1, "Level": 2, "Description": 3, "Uninstalled": 4}
+
+def uninstall_row(pkg_id, info, details):
+    """Builds an uninstall row from the catalog entry and the device's PackageInfo record (None when dumpsys gave none)."""
+    row = ("☐", pkg_id, info.removal, info.description.replace('\n', ' ').strip() or 'N/A')
+    if details is None: return row + ('', '', '', '', -1)
+    return row + (details.version, "Enabled" if details.enabled else "Disabled", "System" if details.system else "User", details.location, details.version_code)
+
+def render_uninstall_row(item, checked): return (("☑" if checked else "☐", item[1], item[2], item[4], item[5], item[6], item[7], item[3]), (item[2],))
+def render_restore_row(item, checked): return (("☑" if checked else "☐", item[1], item[2], item[4], item[3]), (item[2],))
 
 # --- MAIN GRAPHICAL USER INTERFACE (GUI) CLASS ---
 class App:
@@ -63,6 +66,12 @@ class App:
         style.map('Treeview', background=[('selected', '#0078D7')])
         style.configure("Vertical.TScrollbar", background=BG_COLOR, troughcolor=TREE_BG, bordercolor=BG_COLOR, arrowcolor=FG_COLOR)
 
+        device_frame = ttk.Frame(root, padding=(10, 10, 10, 0)); device_frame.pack(side="top", fill="x")
+        ttk.Label(device_frame, text="Device:").pack(side="left", padx=(0, 5))
+        self.device_var = tk.StringVar(); self.device_combo = ttk.Combobox(device_frame, textvariable=self.device_var, state="readonly", width=45); self.device_combo.pack(side="left")
+        ttk.Button(device_frame, text="Refresh Devices", command=self.refresh_devices).pack(side="left", padx=5)
+        self.fleet_var = tk.BooleanVar(); ttk.Checkbutton(device_frame, text="Fleet mode (all attached devices)", variable=self.fleet_var).pack(side="left", padx=(15, 5))
+
         self.notebook = ttk.Notebook(root, style='TNotebook')
         self.notebook.pack(pady=10, padx=10, fill="both", expand=True)
         self.uninstall_tab, self.restore_tab = ttk.Frame(self.notebook), ttk.Frame(self.notebook)
@@ -72,31 +81,64 @@ class App:
         ttk.Label(log_frame, text="Output Log:", font=('Segoe UI', 11, 'bold')).pack(anchor='w')
         self.log_output = scrolledtext.ScrolledText(log_frame, height=6, background=TREE_BG, foreground=FG_COLOR, relief='flat', font=('Consolas', 10), state='disabled')
         self.log_output.pack(fill="x", expand=True)
+        self.log_sink = LogSink(); self.root.after(LOG_FLUSH_MS, self._flush_log)
         
         # Instance Variables
-        self.setup_logging_dir()
         self.all_uninstall_items, self.all_restore_items = [], []
-        self.tree_item_data = {}; self.checked_uninstall_items, self.checked_restore_items = set(), set()
+        self.uninstall_index, self.restore_index = SearchIndex([], item_search_text), SearchIndex([], item_search_text); self.pending_filters = {}
+        self.checked_uninstall_items, self.checked_restore_items = set(), set()
         self.sort_column, self.sort_reverse = None, False; self.tooltip_window, self.tooltip_item_id = None, None
+        self.uninstall_model = PackageListModel(self.checked_uninstall_items, UNINSTALL_COLUMNS, UNINSTALL_SORT_KEYS)
+        self.restore_model = PackageListModel(self.checked_restore_items, RESTORE_COLUMNS)
+        self.uninstall_rows = {}
 
         self.create_uninstall_tab(); self.create_restore_tab(); self.bloatware_data = self._load_bloatware_data()
+        self.engine = Engine(log=self.log_message, catalog=self.bloatware_data)
+        self.refresh_devices()
 
     # ... (All methods of the App class are here, unchanged from the previous version) ...
     def on_closing(self):
         self.log_message("Closing application and shutting down ADB server...")
+        if tracer.enabled:
+            try: path, summary = self.engine.export_trace(); self.log_sink.file_logger.info(f"Timing trace saved to {path}\n{summary}")
+            except OSError as e: print(f"Could not save timing trace: {e}")
         try: run_command([ADB_PATH, "kill-server"])
         except Exception as e: print(f"Could not kill ADB server on exit: {e}")
         finally: self.root.destroy()
-    def setup_logging_dir(self):
-        if not os.path.exists(LOG_DIR): os.makedirs(LOG_DIR)
-    def log_message(self, message):
-        self.log_output.config(state='normal'); self.log_output.insert(tk.END, f"[{datetime.now().strftime('%H:%M:%S')}] {message}\n"); self.log_output.config(state='disabled'); self.log_output.see(tk.END)
+    def refresh_devices(self): self.threaded_task(self._refresh_devices_thread)
+    @traced('thread')
+    def _refresh_devices_thread(self):
+        devices, error = self.engine.refresh_devices()
+        if error: self.log_message(f"Error listing devices: {error}"); return
+        labels = [f"{d['serial']} ({d.get('model', 'unknown').replace('_', ' ')})" for d in self.engine.devices]
+        self.root.after(0, self._update_device_combo, labels)
+        unusable = [f"{d['serial']} ({d['state']})" for d in devices if d['state'] != 'device']
+        self.log_message(f"Found {len(self.engine.devices)} ready device(s)." + (f" Not ready: {', '.join(unusable)}" if unusable else ""))
+    def _update_device_combo(self, labels):
+        self.device_combo.config(values=labels)
+        if self.device_var.get() not in labels: self.device_var.set(labels[0] if labels else "")
+    def current_serial(self):
+        label = self.device_var.get(); return label.split()[0] if label else None
+    def target_serials(self):
+        """Every ready device in fleet mode, otherwise just the selected one (None lets adb pick its default)."""
+        if self.fleet_var.get() and self.engine.devices: return [d['serial'] for d in self.engine.devices]
+        return [self.current_serial()]
+    def log_message(self, message): self.log_sink.emit(message)
+    @traced('tk')
+    def _flush_log(self):
+        """Runs on the Tk thread every LOG_FLUSH_MS: one insert per batch, trimming the widget to LOG_MAX_LINES."""
+        lines = self.log_sink.drain()
+        if lines:
+            self.log_output.config(state='normal'); self.log_output.insert(tk.END, '\n'.join(lines) + '\n')
+            excess = int(self.log_output.index('end-1c').split('.')[0]) - 1 - LOG_MAX_LINES
+            if excess > 0: self.log_output.delete('1.0', f'{excess + 1}.0')
+            self.log_output.config(state='disabled'); self.log_output.see(tk.END)
+        self.root.after(LOG_FLUSH_MS, self._flush_log)
     def _load_bloatware_data(self):
         try:
-            with open(UAD_LIST_FILE, 'r', encoding='utf-8') as f: data = json.load(f)
-            return {item['id']: item for item in data}
+            return load_catalog(UAD_LIST_FILE, CACHE_DIR)
         except (FileNotFoundError, json.JSONDecodeError) as e:
-            messagebox.showerror("Error", f"Could not load {UAD_LIST_FILE}: {e}"); self.root.quit(); return {}
+            messagebox.showerror("Error", f"Could not load {UAD_LIST_FILE}: {e}"); self.root.quit(); return Catalog.empty()
     def create_uninstall_tab(self):
         top_frame = ttk.Frame(self.uninstall_tab); top_frame.pack(fill="x", pady=(0, 5))
         action_frame = ttk.Frame(top_frame); action_frame.pack(fill="x", pady=(0, 10))
@@ -107,15 +149,17 @@ class App:
         ttk.Button(action_frame, text="Reboot...", command=self.open_reboot_window).pack(side="left", padx=(15, 5))
         search_frame = ttk.Frame(top_frame); search_frame.pack(fill="x", pady=5)
         ttk.Label(search_frame, text="Search:").pack(side="left", padx=(0, 5))
-        self.uninstall_search_var = tk.StringVar(); search_entry = ttk.Entry(search_frame, textvariable=self.uninstall_search_var, width=40); search_entry.pack(side="left", fill="x", expand=True); search_entry.bind("<KeyRelease>", self.filter_uninstall_list)
+        self.uninstall_search_var = tk.StringVar(); search_entry = ttk.Entry(search_frame, textvariable=self.uninstall_search_var, width=40); search_entry.pack(side="left", fill="x", expand=True); search_entry.bind("<KeyRelease>", lambda e: self.schedule_filter('uninstall', self.filter_uninstall_list))
         tree_frame = ttk.Frame(self.uninstall_tab); tree_frame.pack(fill="both", expand=True)
-        self.uninstall_tree = ttk.Treeview(tree_frame, columns=("Select", "Package", "Level", "Description"), show="headings")
-        for col in ["Package", "Level", "Description"]: self.uninstall_tree.heading(col, text=col.replace("_", " "), command=lambda c=col: self.sort_treeview_column(c))
+        self.uninstall_tree = ttk.Treeview(tree_frame, columns=UNINSTALL_TREE_COLUMNS, show="headings")
+        for col in UNINSTALL_TREE_COLUMNS[1:]: self.uninstall_tree.heading(col, text=col.replace("_", " "), command=lambda c=col: self.sort_treeview_column(c))
         self.uninstall_tree.heading("Select", text=""); self.uninstall_tree.column("Select", width=40, anchor="center", stretch=False)
-        self.uninstall_tree.column("Package", width=250); self.uninstall_tree.column("Level", width=120, anchor="center"); self.uninstall_tree.column("Description", width=550)
+        self.uninstall_tree.column("Package", width=230); self.uninstall_tree.column("Level", width=110, anchor="center"); self.uninstall_tree.column("Version", width=110, anchor="center")
+        for col in ["State", "Type", "Location"]: self.uninstall_tree.column(col, width=75, anchor="center")
+        self.uninstall_tree.column("Description", width=360)
         for tag, color in [('Recommended', 'lightgreen'), ('Advanced', 'orange'), ('Expert', '#FF6347'), ('Unsafe', 'magenta')]: self.uninstall_tree.tag_configure(tag, foreground=color)
-        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.uninstall_tree.yview, style="Vertical.TScrollbar"); vsb.pack(side='right', fill='y')
-        self.uninstall_tree.configure(yscrollcommand=vsb.set); self.uninstall_tree.pack(fill="both", expand=True)
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical", style="Vertical.TScrollbar"); vsb.pack(side='right', fill='y')
+        self.uninstall_tree.pack(fill="both", expand=True); self.uninstall_view = VirtualTreeView(self.uninstall_tree, vsb, self.uninstall_model, render_uninstall_row, on_scroll=self.hide_tooltip)
         self.uninstall_tree.bind("<Button-1>", self.on_tree_click); self.uninstall_tree.bind("<Motion>", self.on_tree_motion); self.uninstall_tree.bind("<Leave>", self.hide_tooltip)
     def create_restore_tab(self):
         action_frame = ttk.Frame(self.restore_tab); action_frame.pack(fill="x", pady=(0, 10))
@@ -126,14 +170,16 @@ class App:
         search_frame = ttk.Frame(self.restore_tab); search_frame.pack(fill="x", pady=5)
         ttk.Label(search_frame, text="Search:").pack(side="left", padx=(0, 5))
         self.restore_search_var = tk.StringVar(); search_entry = ttk.Entry(search_frame, textvariable=self.restore_search_var, width=40)
-        search_entry.pack(side="left", fill="x", expand=True); search_entry.bind("<KeyRelease>", self.filter_restore_list)
+        search_entry.pack(side="left", fill="x", expand=True); search_entry.bind("<KeyRelease>", lambda e: self.schedule_filter('restore', self.filter_restore_list))
         tree_frame = ttk.Frame(self.restore_tab); tree_frame.pack(fill="both", expand=True)
-        self.restore_tree = ttk.Treeview(tree_frame, columns=("Select", "Package"), show="headings")
-        self.restore_tree.heading("Select", text=""); self.restore_tree.heading("Package", text="Package Name")
-        self.restore_tree.column("Select", width=40, anchor="center", stretch=False); self.restore_tree.column("Package", width=300)
-        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.restore_tree.yview, style="Vertical.TScrollbar"); vsb.pack(side='right', fill='y')
-        self.restore_tree.configure(yscrollcommand=vsb.set); self.restore_tree.pack(fill="both", expand=True)
-        self.restore_tree.bind("<Button-1>", lambda e: self.toggle_checkbox(e, self.restore_tree, self.checked_restore_items))
+        self.restore_tree = ttk.Treeview(tree_frame, columns=("Select", "Package", "Level", "Uninstalled", "Description"), show="headings")
+        for col, text in [("Select", ""), ("Package", "Package Name"), ("Level", "Level"), ("Uninstalled", "Last Uninstalled"), ("Description", "Description")]: self.restore_tree.heading(col, text=text)
+        self.restore_tree.column("Select", width=40, anchor="center", stretch=False); self.restore_tree.column("Package", width=250); self.restore_tree.column("Level", width=120, anchor="center")
+        self.restore_tree.column("Uninstalled", width=200, anchor="center"); self.restore_tree.column("Description", width=400)
+        for tag, color in [('Recommended', 'lightgreen'), ('Advanced', 'orange'), ('Expert', '#FF6347'), ('Unsafe', 'magenta')]: self.restore_tree.tag_configure(tag, foreground=color)
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical", style="Vertical.TScrollbar"); vsb.pack(side='right', fill='y')
+        self.restore_tree.pack(fill="both", expand=True); self.restore_view = VirtualTreeView(self.restore_tree, vsb, self.restore_model, render_restore_row)
+        self.restore_tree.bind("<Button-1>", lambda e: self.toggle_view_checkbox(e, self.restore_view))
     def open_auto_select_window(self):
         dialog = tk.Toplevel(self.root); dialog.title("Auto-Select by Level"); dialog.configure(bg='#3C3C3C'); dialog.transient(self.root); dialog.grab_set(); dialog.resizable(False, False)
         ttk.Label(dialog, text="Select levels to automatically check:", font=('Segoe UI', 11, 'bold')).pack(pady=10, padx=10)
@@ -156,35 +202,53 @@ class App:
         reboot_options = {"Reboot System": "reboot", "Reboot to Recovery": "reboot recovery", "Reboot to Bootloader": "reboot bootloader", "Reboot to Download Mode": "reboot download"}
         for text, command in reboot_options.items(): ttk.Button(button_frame, text=text, command=lambda c=command: self.reboot_device(c, dialog)).pack(pady=5, fill='x')
     def open_uninstall_history_window(self):
-        dialog = tk.Toplevel(self.root); dialog.title("Uninstall History"); dialog.configure(bg='#2E2E2E'); dialog.geometry("800x600"); dialog.transient(self.root); dialog.grab_set()
+        dialog = tk.Toplevel(self.root); dialog.title("Uninstall History"); dialog.configure(bg='#2E2E2E'); dialog.geometry("900x600"); dialog.transient(self.root); dialog.grab_set()
+        find_frame = ttk.Frame(dialog, padding=(10, 10, 10, 0)); find_frame.pack(fill="x"); ttk.Label(find_frame, text="Find package:").pack(side="left", padx=(0, 5))
+        find_var = tk.StringVar(); find_entry = ttk.Entry(find_frame, textvariable=find_var, width=40); find_entry.pack(side="left", fill="x", expand=True); find_entry.bind("<Return>", lambda e: self.show_package_history(dialog, find_var.get()))
+        ttk.Button(find_frame, text="Find", command=lambda: self.show_package_history(dialog, find_var.get())).pack(side="left", padx=5)
         main_frame = ttk.Frame(dialog, padding=10); main_frame.pack(fill="both", expand=True)
         left_pane = ttk.Frame(main_frame); left_pane.pack(side="left", fill="both", expand=True, padx=(0, 10)); ttk.Label(left_pane, text="Uninstall Sessions", font=('Segoe UI', 11, 'bold')).pack(anchor='w')
-        log_tree = ttk.Treeview(left_pane, columns=("Timestamp", "Items"), show="headings"); log_tree.heading("Timestamp", text="Date / Time"); log_tree.heading("Items", text="App Count"); log_tree.column("Timestamp", width=150); log_tree.column("Items", width=60, anchor="center"); log_tree.pack(fill="both", expand=True)
+        log_tree = ttk.Treeview(left_pane, columns=("Timestamp", "Device", "Items"), show="headings"); log_tree.heading("Timestamp", text="Date / Time"); log_tree.heading("Device", text="Device"); log_tree.heading("Items", text="App Count"); log_tree.column("Timestamp", width=150); log_tree.column("Device", width=110); log_tree.column("Items", width=60, anchor="center")
+        page_state = {'loaded': 0, 'total': 0}; log_vsb = ttk.Scrollbar(left_pane, orient="vertical", command=log_tree.yview, style="Vertical.TScrollbar"); log_vsb.pack(side='right', fill='y')
+        def on_log_scroll(first, last):
+            # Sessions are paged in lazily: the next page loads once the list is scrolled to its end.
+            log_vsb.set(first, last)
+            if float(last) >= 1.0 and page_state['loaded'] < page_state['total']: self.load_history_page(log_tree, page_state)
+        log_tree.configure(yscrollcommand=on_log_scroll); log_tree.pack(fill="both", expand=True)
         right_pane = ttk.Frame(main_frame); right_pane.pack(side="right", fill="both", expand=True); ttk.Label(right_pane, text="Packages in Session", font=('Segoe UI', 11, 'bold')).pack(anchor='w')
         pkg_tree = ttk.Treeview(right_pane, columns=("Select", "Package"), show="headings"); pkg_tree.heading("Select", text=""); pkg_tree.heading("Package", text="Package Name"); pkg_tree.column("Select", width=40, anchor="center", stretch=False); pkg_tree.column("Package", width=250); pkg_tree.pack(fill="both", expand=True)
         history_checked_items = set(); pkg_tree.bind("<Button-1>", lambda e: self.toggle_checkbox(e, pkg_tree, history_checked_items))
         button_frame = ttk.Frame(dialog); button_frame.pack(pady=10, fill='x'); ttk.Button(button_frame, text="Apply Selections to Restore List", command=lambda: self.apply_history_selection(dialog, history_checked_items)).pack(side="left", padx=10)
         ttk.Button(button_frame, text="Deselect All", command=lambda: self.deselect_history(pkg_tree, history_checked_items)).pack(side="left", padx=10)
         ttk.Button(button_frame, text="Close", command=dialog.destroy).pack(side="right", padx=10)
-        self.populate_history_logs_list(log_tree, pkg_tree); log_tree.bind("<<TreeviewSelect>>", lambda e: self.on_history_log_select(e, log_tree, pkg_tree, history_checked_items))
-    def populate_history_logs_list(self, log_tree, pkg_tree):
+        self.populate_history_logs_list(log_tree, pkg_tree, page_state); log_tree.bind("<<TreeviewSelect>>", lambda e: self.on_history_log_select(e, log_tree, pkg_tree, history_checked_items))
+    def populate_history_logs_list(self, log_tree, pkg_tree, page_state):
         log_tree.delete(*log_tree.get_children()); pkg_tree.delete(*pkg_tree.get_children())
-        try:
-            log_files = sorted([f for f in os.listdir(LOG_DIR) if f.endswith(".json")], reverse=True)
-            for filename in log_files:
-                with open(os.path.join(LOG_DIR, filename), 'r') as f:
-                    data = json.load(f); date_str = filename.replace("uninstall_", "").replace(".json", "").replace("_", " ")
-                    log_tree.insert("", "end", values=(date_str, len(data)), iid=filename)
-        except Exception as e: self.log_message(f"Error reading uninstall logs: {e}")
+        try: page_state.update(loaded=0, total=self.engine.history.session_count())
+        except sqlite3.Error as e: self.log_message(f"Error reading uninstall history: {e}"); return
+        self.load_history_page(log_tree, page_state)
+    def load_history_page(self, log_tree, page_state):
+        try: rows = self.engine.history.sessions(page_state['loaded'], HISTORY_PAGE_SIZE)
+        except sqlite3.Error as e: self.log_message(f"Error reading uninstall history: {e}"); rows = []
+        if not rows: page_state['total'] = page_state['loaded']; return
+        page_state['loaded'] += len(rows)
+        for session_id, started, serial, succeeded in rows: log_tree.insert("", "end", values=(started, serial or "-", succeeded), iid=str(session_id))
     def on_history_log_select(self, event, log_tree, pkg_tree, history_checked_items):
         selected_item = log_tree.focus();
         if not selected_item: return
         pkg_tree.delete(*pkg_tree.get_children()); history_checked_items.clear()
         try:
-            with open(os.path.join(LOG_DIR, selected_item), 'r') as f:
-                packages = json.load(f)
-                for pkg in sorted(packages): pkg_tree.insert("", "end", values=("☐", pkg))
-        except Exception as e: self.log_message(f"Error reading log file {selected_item}: {e}")
+            for pkg in self.engine.history.session_packages(int(selected_item)): pkg_tree.insert("", "end", values=("☐", pkg))
+        except sqlite3.Error as e: self.log_message(f"Error reading uninstall session {selected_item}: {e}")
+    def show_package_history(self, dialog, package):
+        package = package.strip()
+        if not package: return
+        try: rows = self.engine.history.package_history(package)
+        except sqlite3.Error as e: self.log_message(f"Error reading uninstall history: {e}"); return
+        if not rows: messagebox.showinfo("Package History", f"No uninstall or restore of {package} has been recorded.", parent=dialog); return
+        verbs = {('uninstall', 'ok'): "Removed", ('restore', 'ok'): "Restored", ('uninstall', 'failed'): "Removal FAILED", ('restore', 'failed'): "Restore FAILED"}
+        lines = [f"{started}  {verbs.get((kind, outcome), kind)} on {serial or 'default device'}" for started, kind, serial, outcome in rows[:25]]
+        messagebox.showinfo("Package History", f"{package}:\n\n" + "\n".join(lines) + ("\n..." if len(rows) > 25 else ""), parent=dialog)
     def apply_history_selection(self, dialog, history_checked_items):
         for pkg in history_checked_items: self.checked_restore_items.add(pkg)
         self.refresh_restore_tree_checks(); self.log_message(f"Added {len(history_checked_items)} app(s) from history to the restore list."); dialog.destroy()
@@ -196,17 +260,17 @@ class App:
     def on_tree_click(self, event):
         row_id, col_id = self.uninstall_tree.identify_row(event.y), self.uninstall_tree.identify_column(event.x)
         if not row_id: self.hide_tooltip(); return
-        if col_id == "#1": self.toggle_checkbox(event, self.uninstall_tree, self.checked_uninstall_items); self.hide_tooltip()
-        elif col_id == "#4": self.show_tooltip(row_id, event.x_root, event.y_root)
+        if col_id == "#1": self.toggle_view_checkbox(event, self.uninstall_view); self.hide_tooltip()
+        elif col_id == DESCRIPTION_COLUMN_ID: self.show_tooltip(row_id, event.x_root, event.y_root)
         else: self.hide_tooltip()
     def on_tree_motion(self, event):
         if self.tooltip_window and self.uninstall_tree.identify_row(event.y) != self.tooltip_item_id: self.hide_tooltip()
     def show_tooltip(self, item_id, x, y):
         if self.tooltip_window: self.hide_tooltip()
-        full_info = self.tree_item_data.get(item_id)
-        if not full_info or not full_info.get('description', '').strip(): return
+        row = self.uninstall_view.row_at(item_id); full_info = self.bloatware_data.get(self.uninstall_model.package(row)) if row is not None else None
+        if not full_info or not full_info.description.strip(): return
         self.tooltip_item_id = item_id; self.tooltip_window = tk.Toplevel(self.root); self.tooltip_window.wm_overrideredirect(True); self.tooltip_window.wm_geometry(f"+{x+15}+{y+10}")
-        label = tk.Label(self.tooltip_window, text=full_info['description'].strip(), justify='left', background="#FFFFE0", relief='solid', borderwidth=1, wraplength=500, font=("Segoe UI", 10), anchor='w')
+        label = tk.Label(self.tooltip_window, text=full_info.description.strip(), justify='left', background="#FFFFE0", relief='solid', borderwidth=1, wraplength=500, font=("Segoe UI", 10), anchor='w')
         label.pack(ipadx=4, ipady=4)
     def hide_tooltip(self, event=None):
         if self.tooltip_window: self.tooltip_window.destroy(); self.tooltip_window = None; self.tooltip_item_id = None
@@ -214,114 +278,121 @@ class App:
         self.hide_tooltip()
         if self.sort_column == col: self.sort_reverse = not self.sort_reverse
         else: self.sort_column, self.sort_reverse = col, False
-        items = [(self.uninstall_tree.set(k, col), k) for k in self.uninstall_tree.get_children('')]
-        if col == 'Level':
-            level_map = {'Recommended': 1, 'Advanced': 2, 'Expert': 3, 'Unsafe': 4}
-            items.sort(key=lambda t: level_map.get(t[0], 0), reverse=self.sort_reverse)
-        else: items.sort(reverse=self.sort_reverse)
-        for index, (_, k) in enumerate(items): self.uninstall_tree.move(k, '', index)
+        self.uninstall_model.sort(col, self.sort_reverse); self.uninstall_view.refresh()
     def toggle_checkbox(self, event, tree, checked_set):
         row_id = tree.identify_row(event.y)
         if not row_id: return
         pkg_name = tree.item(row_id, "values")[1]
         if pkg_name in checked_set: checked_set.remove(pkg_name); tree.set(row_id, "Select", "☐")
         else: checked_set.add(pkg_name); tree.set(row_id, "Select", "☑")
-    def filter_list(self, search_var, all_items, tree, checked_set, populate_func):
-        query = search_var.get().lower()
-        filtered_items = [item for item in all_items if query in item[1].lower() or (len(item) > 3 and query in item[3].lower())]
-        populate_func(tree, filtered_items, checked_set)
-    def filter_uninstall_list(self, event=None): self.filter_list(self.uninstall_search_var, self.all_uninstall_items, self.uninstall_tree, self.checked_uninstall_items, self.populate_uninstall_tree)
-    def filter_restore_list(self, event=None): self.filter_list(self.restore_search_var, self.all_restore_items, self.restore_tree, self.checked_restore_items, self.populate_restore_tree)
+    def toggle_view_checkbox(self, event, view):
+        row = view.row_at(view.tree.identify_row(event.y))
+        if row is None: return
+        view.model.toggle(row); view.refresh()
+    def schedule_filter(self, key, filter_func):
+        """Debounces keystrokes: only the query typed last, SEARCH_DEBOUNCE_MS after the final key, is evaluated."""
+        pending = self.pending_filters.pop(key, None)
+        if pending: self.root.after_cancel(pending)
+        self.pending_filters[key] = self.root.after(SEARCH_DEBOUNCE_MS, lambda: (self.pending_filters.pop(key, None), filter_func()))
+    def filter_list(self, search_var, index, view):
+        view.model.set_filter(index.search_rows(search_var.get())); view.refresh()
+    def filter_uninstall_list(self, event=None): self.filter_list(self.uninstall_search_var, self.uninstall_index, self.uninstall_view)
+    def filter_restore_list(self, event=None): self.filter_list(self.restore_search_var, self.restore_index, self.restore_view)
     def deselect_all_uninstall(self): self.checked_uninstall_items.clear(); self.refresh_treeview_checks()
     def deselect_all_restore(self): self.checked_restore_items.clear(); self.refresh_restore_tree_checks()
-    def refresh_treeview_checks(self):
-        for item_id in self.uninstall_tree.get_children():
-            if self.uninstall_tree.item(item_id, "values")[1] in self.checked_uninstall_items: self.uninstall_tree.set(item_id, "Select", "☑")
-            else: self.uninstall_tree.set(item_id, "Select", "☐")
-    def refresh_restore_tree_checks(self):
-        for item_id in self.restore_tree.get_children():
-            if self.restore_tree.item(item_id, "values")[1] in self.checked_restore_items: self.restore_tree.set(item_id, "Select", "☑")
-            else: self.restore_tree.set(item_id, "Select", "☐")
+    def refresh_treeview_checks(self): self.uninstall_view.refresh()
+    def refresh_restore_tree_checks(self): self.restore_view.refresh()
     def reboot_device(self, mode, parent_dialog):
         if parent_dialog is not self.root: parent_dialog.destroy()
-        self.log_message(f"Attempting to reboot device to {mode} mode...")
-        self.threaded_task(run_command, [ADB_PATH, mode])
-    def threaded_task(self, target_func, *args): threading.Thread(target=target_func, args=args, daemon=True).start()
-    def populate_uninstall_tree(self, tree, items, checked_set):
-        tree.delete(*tree.get_children()); self.tree_item_data.clear()
-        for item_tuple in items:
-            pkg_id, removal = item_tuple[1], item_tuple[2]
-            checkbox = "☑" if pkg_id in checked_set else "☐"
-            item_id = tree.insert("", "end", values=(checkbox, *item_tuple[1:]), tags=(removal,))
-            self.tree_item_data[item_id] = self.bloatware_data.get(pkg_id, {})
-    def populate_restore_tree(self, tree, items, checked_set):
-        tree.delete(*tree.get_children())
-        for item_tuple in items:
-            pkg_id = item_tuple[1]
-            checkbox = "☑" if pkg_id in checked_set else "☐"
-            tree.insert("", "end", values=(checkbox, pkg_id))
+        for serial in self.target_serials():
+            self.log_message(f"{self.engine.device_prefix(serial)}Attempting to reboot device to {mode} mode...")
+            self.threaded_task(self.engine.reboot, mode, serial)
+    def threaded_task(self, target_func, *args):
+        # Thread entry points carry their own span; anything else sent to the background is timed as a task.
+        if not hasattr(target_func, '__wrapped__'): target_func = tracer.wrap(target_func, 'task')
+        threading.Thread(target=target_func, args=args, daemon=True).start()
+    @traced('tk')
+    def populate_view(self, view, items, filter_func):
+        """Hands a freshly scanned item list to a view's model and re-applies the current search; must run on the Tk thread."""
+        view.model.set_items(items); filter_func()
+    def _show_uninstall_items(self, items, index, detected):
+        # The items and their search index are swapped together on the Tk thread, so a pending filter never mixes old rows with new row numbers.
+        self.all_uninstall_items, self.uninstall_index = items, index
+        self.checked_uninstall_items.intersection_update(detected); self.populate_view(self.uninstall_view, items, self.filter_uninstall_list)
+    def _rebuild_uninstall_items(self):
+        """Recomputes the uninstall list from the per-device detections; rows whose package details are unchanged are reused as is."""
+        detected, previous, rows = sorted(set().union(*self.engine.fleet_packages.values())), self.uninstall_rows, {}
+        for pkg_id in detected:
+            key = (pkg_id, self.engine.package_details(pkg_id))
+            if key in previous: rows[key] = previous[key]
+            elif (info := self.bloatware_data.get(pkg_id)): rows[key] = uninstall_row(pkg_id, info, key[1])
+        self.uninstall_rows = rows; items = list(rows.values())
+        self.root.after(0, self._show_uninstall_items, items, SearchIndex(items, item_search_text), set(detected))
+        return detected
     def scan_for_bloatware(self):
         self.hide_tooltip(); self.log_message("Scanning for device and packages...")
-        self.checked_uninstall_items.clear(); self.all_uninstall_items = []
-        self.threaded_task(self._scan_bloatware_thread)
-    def _scan_bloatware_thread(self):
-        installed, error = run_command([ADB_PATH, 'shell', 'pm', 'list', 'packages']);
-        if error: self.log_message(f"Error: {error}"); return
-        installed_set = {line.replace('package:', '') for line in installed.splitlines()}
-        detected = sorted(list(installed_set.intersection(self.bloatware_data.keys())))
+        self.checked_uninstall_items.clear()
+        self.threaded_task(self._scan_bloatware_thread, self.target_serials())
+    @traced('thread')
+    def _scan_bloatware_thread(self, serials):
+        self.engine.scan(serials); detected = self._rebuild_uninstall_items()
         if not detected: self.log_message("Scan complete. No known bloatware detected."); return
-        self.all_uninstall_items = [("☐", pkg_id, info.get('removal', 'Unknown'), info.get('description', 'N/A').replace('\n', ' ').strip()) for pkg_id in detected if (info := self.bloatware_data.get(pkg_id, {}))]
-        self.populate_uninstall_tree(self.uninstall_tree, self.all_uninstall_items, self.checked_uninstall_items)
         self.log_message(f"Scan complete. Found {len(detected)} potential bloatware app(s).")
-        self.uninstall_btn.config(state="normal")
+        self.root.after(0, lambda: self.uninstall_btn.config(state="normal"))
     def uninstall_selected(self):
         if not self.checked_uninstall_items: messagebox.showwarning("Warning", "No applications selected."); return
-        danger_map = {'Recommended': 1, 'Advanced': 2, 'Expert': 3, 'Unsafe': 4}
-        highest_danger = max((danger_map.get(self.bloatware_data.get(pkg, {}).get('removal'), 1) for pkg in self.checked_uninstall_items), default=0)
+        plan = self.engine.plan(self.checked_uninstall_items)
+        if plan.at_risk:
+            listing = "\n".join(f"• {pkg} (needs {', '.join(needs)})" for pkg, needs in list(plan.at_risk.items())[:15]) + ("\n..." if len(plan.at_risk) > 15 else "")
+            answer = messagebox.askyesnocancel("Dependency Warning", f"These installed packages depend on your selection and may stop working:\n\n{listing}\n\nUninstall them as well?\n(Yes: add them, No: keep them and continue, Cancel: abort)", icon='warning')
+            if answer is None: return
+            if answer: plan = self.engine.plan(self.checked_uninstall_items | set(plan.at_risk))
+        packages = [pkg for wave in plan.waves for pkg in wave]
+        highest_danger = max((LEVEL_ORDER.get(self.bloatware_data.removal(pkg), 1) for pkg in packages), default=0)
         confirm = False
         if highest_danger >= 3:
             confirm = messagebox.askyesno("DANGER: High-Risk Action", "WARNING!\nYou have selected 'Expert' or 'Unsafe' packages. Uninstalling these can cause system instability or require a factory reset (brick).\n\nPLEASE BE SURE BEFORE PROCEEDING.\nDo you want to continue?", icon='error')
         else: # Covers 'Advanced' and 'Recommended'
-            confirm = messagebox.askyesno("Confirm Uninstall", f"Are you sure you want to uninstall {len(self.checked_uninstall_items)} selected application(s)?")
-        if confirm: self.threaded_task(self._uninstall_thread, list(self.checked_uninstall_items))
-    def _uninstall_thread(self, packages):
-        self.log_message(f"Starting uninstall process for {len(packages)} app(s)...")
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        log_filename = os.path.join(LOG_DIR, f"uninstall_{timestamp}.json")
-        success, fail, uninstalled_packages_in_session = 0, 0, []
-        for pkg in packages:
-            _, error = run_command([ADB_PATH, 'shell', 'pm', 'uninstall', '-k', '--user', '0', pkg])
-            if error: fail += 1; self.log_message(f"-> FAILED to uninstall {pkg}: {error}")
-            else: success += 1; self.log_message(f"-> Successfully uninstalled {pkg}"); uninstalled_packages_in_session.append(pkg)
-        if uninstalled_packages_in_session:
-            with open(log_filename, 'w') as f: json.dump(uninstalled_packages_in_session, f, indent=2)
-            self.log_message(f"Uninstall session saved to {log_filename}")
-        summary = f"Uninstall complete. Successful: {success}, Failed: {fail}."
+            confirm = messagebox.askyesno("Confirm Uninstall", f"Are you sure you want to uninstall {len(packages)} selected application(s)?")
+        if confirm: self.threaded_task(self._uninstall_thread, plan.waves, self.target_serials())
+    @traced('thread')
+    def _uninstall_thread(self, waves, serials=(None,)):
+        results = self.engine.uninstall(waves, serials); self._rebuild_uninstall_items()
+        if self.engine.restorable_packages: self._rebuild_restore_items()
+        summary = fleet_summary("Uninstall", results)
         self.log_message(summary); self.root.after(0, self.show_completion_dialog, "Uninstall Finished", summary)
     def scan_for_restorable(self):
         self.log_message("Scanning for restorable packages...")
-        self.checked_restore_items.clear(); self.all_restore_items = []
-        self.threaded_task(self._scan_restorable_thread)
-    def _scan_restorable_thread(self):
-        uninstalled, error = run_command([ADB_PATH, 'shell', 'pm', 'list', 'packages', '-u'])
-        if error: self.log_message(f"Error: {error}"); return
-        restorable = sorted([line.replace('package:', '') for line in uninstalled.splitlines()])
-        if not restorable: self.log_message("Scan complete. No restorable applications found."); return
-        self.all_restore_items = [("☐", pkg) for pkg in restorable]
-        self.populate_restore_tree(self.restore_tree, self.all_restore_items, self.checked_restore_items)
-        self.log_message(f"Scan complete. Found {len(restorable)} restorable app(s).")
-        self.restore_btn.config(state="normal")
+        self.checked_restore_items.clear(); self._show_restore_items([], SearchIndex([], item_search_text), set())
+        self.threaded_task(self._scan_restorable_thread, self.target_serials())
+    def _show_restore_items(self, items, index, restorable):
+        self.all_restore_items, self.restore_index = items, index
+        self.checked_restore_items.intersection_update(restorable); self.populate_view(self.restore_view, items, self.filter_restore_list)
+    def _rebuild_restore_items(self):
+        """Lists the packages the restore scans found removed, with their catalog level / description and last recorded uninstall."""
+        restorable = sorted(set().union(*self.engine.restorable_packages.values()))
+        try: last = self.engine.history.last_uninstalled(restorable)
+        except sqlite3.Error as e: self.log_message(f"Error reading uninstall history: {e}"); last = {}
+        items = []
+        for pkg in restorable:
+            info, when = self.bloatware_data.get(pkg), last.get(pkg)
+            description = (info.description.replace('\n', ' ').strip() if info else '') or 'N/A'
+            items.append(("☐", pkg, info.removal if info else 'Unknown', description, (when[0] + (f" ({when[1]})" if when[1] else '')) if when else ''))
+        self.root.after(0, self._show_restore_items, items, SearchIndex(items, item_search_text), set(restorable))
+        return restorable
+    @traced('thread')
+    def _scan_restorable_thread(self, serials):
+        self.engine.scan_restorable(serials); restorable = self._rebuild_restore_items()
+        if not restorable: self.log_message("Scan complete. No removed applications to restore."); return
+        self.log_message(f"Scan complete. Found {len(restorable)} removed app(s) that can be restored.")
+        self.root.after(0, lambda: self.restore_btn.config(state="normal"))
     def restore_selected(self):
         if not self.checked_restore_items: messagebox.showwarning("Warning", "No applications selected."); return
-        self.threaded_task(self._restore_thread, list(self.checked_restore_items))
-    def _restore_thread(self, packages):
-        self.log_message(f"Starting restore process for {len(packages)} app(s)...")
-        success, fail = 0, 0
-        for pkg in packages:
-            _, error = run_command([ADB_PATH, 'shell', 'cmd', 'package', 'install-existing', pkg])
-            if error: fail += 1; self.log_message(f"-> FAILED to restore {pkg}: {error}")
-            else: success += 1; self.log_message(f"-> Successfully restored {pkg}")
-        summary = f"Restore complete. Successful: {success}, Failed: {fail}."
+        self.threaded_task(self._restore_thread, list(self.checked_restore_items), self.target_serials())
+    @traced('thread')
+    def _restore_thread(self, packages, serials=(None,)):
+        summary = fleet_summary("Restore", self.engine.restore(packages, serials)); self._rebuild_uninstall_items()
+        if self.engine.restorable_packages: self._rebuild_restore_items()
         self.log_message(summary); self.root.after(0, self.show_completion_dialog, "Restore Finished", summary)
 
 # --- NEW DISCLAIMER LOGIC ---
@@ -0,0 +1,16 @@
+# Search index behind the uninstall / restore filter boxes
+class SearchIndex:
+    """Lower-cased search text per item, computed once; a query that extends the last one is narrowed from its results."""
+    def __init__(self, items, text_of):
+        self.texts = [text_of(item).lower() for item in items]
+        self.last_query, self.last_rows = '', range(len(items))
+    def _candidates(self, query):
+        # A plain substring scan of a few thousand short texts takes well under a millisecond, so no postings are kept:
+        # building them cost far more than every keystroke they would ever save.
+        return self.last_rows if self.last_query and self.last_query in query else range(len(self.texts))
+    def search_rows(self, query):
+        """Returns the (ascending) row numbers of items whose text contains query, case-insensitively."""
+        query = query.lower()
+        rows = [row for row in self._candidates(query) if query in self.texts[row]] if query else range(len(self.texts))
+        self.last_query, self.last_rows = query, rows
+        return rows
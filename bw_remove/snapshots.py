@@ -0,0 +1,46 @@
+# Per-device package snapshots, so rescans and post-batch updates only touch what changed
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+SNAPSHOT_SUBDIR = 'snapshots'
+DEFAULT_DEVICE_KEY = '_default'
+
+class SnapshotStore:
+    """Last known installed-package set per device serial, kept in memory and persisted as one JSON file per serial."""
+    def __init__(self, cache_dir):
+        self.directory = os.path.join(cache_dir, SNAPSHOT_SUBDIR)
+        self._snapshots, self._lock = {}, threading.Lock()
+    def _path(self, serial):
+        return os.path.join(self.directory, re.sub(r'[^A-Za-z0-9._-]', '_', serial or DEFAULT_DEVICE_KEY) + '.json')
+    def get(self, serial):
+        """Returns the cached package set for serial (loading it from disk once), or None if the device was never scanned."""
+        with self._lock:
+            if serial not in self._snapshots:
+                try:
+                    with open(self._path(serial), 'r', encoding='utf-8') as f: self._snapshots[serial] = set(json.load(f)['packages'])
+                except (OSError, ValueError, KeyError, TypeError): self._snapshots[serial] = None
+            return self._snapshots[serial]
+    def _save(self, serial, packages):
+        self._snapshots[serial] = packages
+        try:
+            os.makedirs(self.directory, exist_ok=True); path = self._path(serial)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump({'serial': serial, 'updated': datetime.now().isoformat(timespec='seconds'), 'packages': sorted(packages)}, f)
+            os.replace(path + '.tmp', path)
+        except OSError: pass  # The in-memory snapshot still serves this session
+    def update(self, serial, installed):
+        """Replaces the snapshot with a fresh scan and returns (added, removed) relative to the previous one (None if there was none)."""
+        previous = self.get(serial)
+        with self._lock:
+            self._save(serial, set(installed))
+        if previous is None: return None
+        return (installed - previous, previous - installed)
+    def apply(self, serial, added=(), removed=()):
+        """Folds the outcome of an uninstall/restore batch into the snapshot without rescanning."""
+        current = self.get(serial)
+        if current is None: return
+        with self._lock:
+            self._save(serial, (current - set(removed)) | set(added))
@@ -0,0 +1,127 @@
+# Switchable timing spans for ADB commands, worker threads and UI updates, exported as Chrome trace JSON or a summary table
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+TRACE_ENV_VAR = 'BWR_TRACE'
+MAX_EVENTS = 200000
+MAX_SAMPLES_PER_KEY = 10000
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+def command_type(words):
+    """Groups a command line by its leading verbs, e.g. `pm uninstall -k --user 0 x.y` -> "pm uninstall"."""
+    kind = []
+    for word in words:
+        if len(kind) == 3 or word.startswith('-') or '.' in word or '/' in word: break
+        kind.append(word)
+    return ' '.join(kind) or '?'
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+class Span:
+    """One open timing span; extra details for the trace go in `args`."""
+    __slots__ = ('tracer', 'name', 'category', 'device', 'args', 'start')
+    def __init__(self, tracer, name, category, device, args):
+        self.tracer, self.name, self.category, self.device, self.args = tracer, name, category, device, args
+    def __enter__(self):
+        self.start = time.perf_counter(); return self
+    def __exit__(self, *exc_info):
+        self.tracer.record(self.name, self.category, self.start, time.perf_counter() - self.start, self.device, self.args)
+
+class _NullSpan:
+    """Stands in for Span while tracing is off, so instrumented code costs one attribute check."""
+    __slots__ = ()
+    args = {}
+    def __enter__(self): return self
+    def __exit__(self, *exc_info): pass
+
+NULL_SPAN = _NullSpan()
+
+class Tracer:
+    """Collects spans from any thread: a bounded event list for the trace, plus latency samples and histograms per device and span name."""
+    def __init__(self, enabled=False):
+        self.enabled, self._lock = enabled, threading.Lock(); self.reset()
+    def reset(self):
+        with self._lock:
+            self.origin, self.events, self.thread_names = time.perf_counter(), deque(maxlen=MAX_EVENTS), {}
+            self.samples, self.buckets, self.maxima = {}, {}, {}
+    def span(self, name, category, device=None, **args):
+        return Span(self, name, category, device, args) if self.enabled else NULL_SPAN
+    def record(self, name, category, start, duration, device=None, args=None):
+        thread, key = threading.current_thread(), (category, name, device)
+        with self._lock:
+            self.events.append((name, category, start - self.origin, duration, thread.ident, device, args))
+            self.thread_names.setdefault(thread.ident, thread.name)
+            samples = self.samples.get(key)
+            if samples is None: samples = self.samples[key] = deque(maxlen=MAX_SAMPLES_PER_KEY); self.buckets[key] = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+            samples.append(duration); self.buckets[key][bisect_left(HISTOGRAM_BOUNDS_MS, duration * 1000)] += 1
+            self.maxima[key] = max(self.maxima.get(key, 0.0), duration)
+    def traced(self, category):
+        """Decorator: times every call of the function as a span named after it (checked per call, so tracing can be switched on later)."""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled: return func(*args, **kwargs)
+                with Span(self, func.__name__, category, None, {}): return func(*args, **kwargs)
+            return wrapper
+        return decorate
+    def wrap(self, func, category):
+        """Returns func timed as one span per call while tracing is on, or func itself."""
+        return self.traced(category)(func) if self.enabled else func
+    def timed_stream(self, results, name_of, category, device=None):
+        """Re-yields (index, ...) results, recording the time spent producing each one (not the time the consumer holds it)."""
+        resumed = time.perf_counter()
+        for result in results:
+            now = time.perf_counter(); self.record(name_of(result[0]), category, resumed, now - resumed, device)
+            yield result
+            resumed = time.perf_counter()
+
+    # --- EXPORT ---
+    def histograms(self):
+        """{device: {"category/name": {bucket label: count}}}, devices without a serial under "-"."""
+        labels = [f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+        result = {}
+        with self._lock:
+            for (category, name, device), counts in self.buckets.items():
+                result.setdefault(device or '-', {})[f"{category}/{name}"] = {label: count for label, count in zip(labels, counts) if count}
+        return result
+    def summary(self):
+        """(category, name, count, p50, p95, max) rows in seconds, one per span name across all devices, slowest total first."""
+        with self._lock:
+            grouped = {}
+            for (category, name, _), samples in self.samples.items():
+                grouped.setdefault((category, name), []).extend(samples)
+            maxima = {}
+            for (category, name, _), value in self.maxima.items(): maxima[(category, name)] = max(maxima.get((category, name), 0.0), value)
+            counts = {}
+            for (category, name, _), buckets in self.buckets.items(): counts[(category, name)] = counts.get((category, name), 0) + sum(buckets)
+        rows = []
+        for key, samples in grouped.items():
+            samples.sort(); rows.append((*key, counts[key], percentile(samples, 0.5), percentile(samples, 0.95), maxima[key], sum(samples)))
+        return [row[:6] for row in sorted(rows, key=lambda row: -row[6])]
+    def format_summary(self):
+        rows = self.summary()
+        if not rows: return "No timing spans recorded."
+        lines = [f"{'category':<10} {'span':<32} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}"]
+        lines += [f"{category:<10} {name[:32]:<32} {count:>7} {p50 * 1000:>9.2f} {p95 * 1000:>9.2f} {peak * 1000:>9.2f}" for category, name, count, p50, p95, peak in rows]
+        return '\n'.join(lines)
+    def chrome_trace(self):
+        """The session in Chrome's trace-event format (chrome://tracing, Perfetto), with the per-device histograms alongside."""
+        pid = os.getpid()
+        with self._lock: events, thread_names = list(self.events), dict(self.thread_names)
+        trace = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}} for tid, name in thread_names.items()]
+        for name, category, start, duration, tid, device, args in events:
+            details = dict(args or {}, **({'device': device} if device else {}))
+            trace.append({'name': name, 'cat': category, 'ph': 'X', 'ts': round(start * 1e6, 3), 'dur': round(duration * 1e6, 3), 'pid': pid, 'tid': tid, 'args': details})
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms', 'otherData': {'histograms': self.histograms()}}
+    def export(self, path):
+        with open(path, 'w', encoding='utf-8') as f: json.dump(self.chrome_trace(), f)
+        return path
+
+tracer = Tracer(enabled=os.environ.get(TRACE_ENV_VAR, '0') == '1')
+traced = tracer.traced
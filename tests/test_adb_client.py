@@ -0,0 +1,70 @@
+# Native ADB client against the in-process fake ADB server (fake_adb), no device or adb binary needed
+import os
+import sys
+import unittest
+from unittest import mock
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bw_remove'))
+import engine
+from adb_client import AdbClient, AdbError, ShellV2Unsupported, parse_sentinel
+from fake_adb import FakeAdbServer, FakeDevice
+
+PACKAGES = ['com.example.one', 'com.example.two', 'com.example.three']
+
+class AdbClientTest(unittest.TestCase):
+    def setUp(self):
+        self.device = FakeDevice('FAKE0000', PACKAGES)
+        self.server = FakeAdbServer([self.device, FakeDevice('OLD0000', PACKAGES, features=('cmd',))]).start()
+        self.client = AdbClient(port=self.server.port)
+    def tearDown(self):
+        self.client.close(); self.server.stop()
+
+    def test_run_batch_yields_output_and_exit_code_per_command(self):
+        results = list(self.client.shell_batch('FAKE0000', ['pm list packages', 'pm uninstall -k --user 0 com.example.two', 'pm uninstall -k --user 0 com.example.two', 'nosuchcommand']))
+        self.assertEqual([index for index, _, _ in results], [0, 1, 2, 3])
+        self.assertEqual(results[0][1:], (0, '\n'.join(f"package:{pkg}" for pkg in PACKAGES)))
+        self.assertEqual(results[1][1:], (0, 'Success'))
+        self.assertEqual(results[2][1:], (1, 'Failure [not installed for 0]'))
+        self.assertEqual(results[3][1], 127)
+
+    def test_parse_sentinel_splits_output_written_without_a_trailing_newline(self):
+        self.assertEqual(parse_sentinel('partial__BWR_DONE__ab12 4 1', '__BWR_DONE__ab12'), ('partial', 4, 1))
+        self.assertIsNone(parse_sentinel('package:com.example.one', '__BWR_DONE__ab12'))
+
+    def test_parse_sentinel_ignores_a_script_line_echoed_by_a_pty_shell(self):
+        echoed = 'shell@x:/ $ pm uninstall -k --user 0 com.x 2>&1; echo "__BWR_DONE__ab12 0 $?"'
+        self.assertIsNone(parse_sentinel(echoed, '__BWR_DONE__ab12'))
+        self.assertIsNone(parse_sentinel('__BWR_DONE__ab12 0 1 trailing', '__BWR_DONE__ab12'))
+
+    def test_stream_yields_lines_and_returns_exit_code(self):
+        lines, stream = [], self.client.shell_stream('FAKE0000', 'pm list packages')
+        with self.assertRaises(StopIteration) as done:
+            while True: lines.append(next(stream))
+        self.assertEqual((lines, done.exception.value), ([f"package:{pkg}" for pkg in PACKAGES], 0))
+
+    def test_server_fail_reply_raises_adb_error(self):
+        with self.assertRaisesRegex(AdbError, "device 'MISSING' not found"): self.client.shell('MISSING', 'pm list packages')
+
+    def test_stale_pooled_sessions_are_replaced_after_a_dropped_connection(self):
+        list(self.client.shell_batch('FAKE0000', ['true'])); list(self.client.shell_batch('FAKE0000', ['true']))
+        self.assertEqual(len(self.client._idle['FAKE0000']), 1)
+        self.server.drop_connections()
+        for _ in range(3): self.assertEqual(self.client.shell('FAKE0000', 'pm list packages')[0], 0)
+        self.assertEqual(len(self.client._idle['FAKE0000']), 1)
+
+    def test_reboot_closes_idle_sessions(self):
+        self.client.shell('FAKE0000', 'true')
+        with mock.patch.object(engine, 'adb_client', self.client), mock.patch.object(engine, 'USE_NATIVE_ADB', True):
+            self.assertEqual(engine.run_command(engine.adb_command('reboot', serial='FAKE0000')), ('', None))
+        self.assertNotIn('FAKE0000', self.client._idle)
+
+    def test_device_without_shell_v2_falls_back_to_spawning_adb(self):
+        self.assertIn('shell_v2', self.client.features('FAKE0000'))
+        with self.assertRaises(ShellV2Unsupported): self.client.acquire_shell('OLD0000')
+        missing_adb = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'no-such-adb')
+        with mock.patch.object(engine, 'adb_client', self.client), mock.patch.object(engine, 'USE_NATIVE_ADB', True), mock.patch.object(engine, 'ADB_PATH', missing_adb):
+            _, error = engine.run_command(engine.adb_command('shell', 'pm', 'list', 'packages', serial='OLD0000'))
+            self.assertIn(missing_adb, error)
+            self.assertIn(missing_adb, list(engine.run_shell_batch(['pm list packages'], serial='OLD0000'))[0][2])
+
+if __name__ == '__main__':
+    unittest.main()
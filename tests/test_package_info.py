@@ -0,0 +1,85 @@
+# `dumpsys package packages` parsing, on excerpts laid out the way Android 13 and Android 6 print them
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bw_remove'))
+from package_info import PackageInfo, parse_dumpsys_packages
+
+ANDROID_13 = """\
+Database versions:
+  Internal:
+    sdkVersion=33 databaseVersion=3
+    versionCode=1 fingerprint=should/not/be/read
+
+Packages:
+  Package [com.android.chrome] (8b1c2f3):
+    userId=10123
+    sharedUser=null
+    pkg=Package{4d5e6f7 com.android.chrome}
+    codePath=/product/app/Chrome
+    resourcePath=/product/app/Chrome
+    primaryCpuAbi=arm64-v8a
+    versionCode=573712133 minSdk=29 targetSdk=33
+    minExtensionVersions=[]
+    versionName=110.0.5481.154
+    usesNonSdkApi=false
+    flags=[ SYSTEM HAS_CODE ALLOW_CLEAR_USER_DATA ALLOW_BACKUP ]
+    privateFlags=[ PRIVATE_FLAG_ACTIVITIES_RESIZE_MODE_RESIZEABLE_VIA_SDK_VERSION PRIVILEGED ]
+    timeStamp=2008-12-31 16:00:00
+    User 0: ceDataInode=123456 installed=true hidden=false suspended=false distractionFlags=0 stopped=false notLaunched=false enabled=3 instant=false virtual=false
+      lastDisabledCaller: com.android.settings
+      gids=[3003]
+  Package [com.facebook.katana] (1a2b3c4):
+    userId=10211
+    pkg=Package{5e6f7a8 com.facebook.katana}
+    codePath=/data/app/~~x1Y2z3==/com.facebook.katana-Ab9Cd8==
+    versionCode=391100313 minSdk=28 targetSdk=33
+    versionName=402.0.0.29.104
+    flags=[ HAS_CODE ALLOW_CLEAR_USER_DATA ]
+    User 0: ceDataInode=654321 installed=true hidden=false suspended=false distractionFlags=0 stopped=true notLaunched=false enabled=0 instant=false virtual=false
+
+Hidden system packages:
+  Package [com.android.chrome] (9f8e7d6):
+    userId=10123
+    codePath=/product/app/Chrome
+    versionCode=447211456 minSdk=29 targetSdk=31
+    versionName=94.0.4606.85
+    flags=[ SYSTEM HAS_CODE ALLOW_CLEAR_USER_DATA ALLOW_BACKUP ]
+"""
+
+ANDROID_6 = """\
+Packages:
+  Package [com.sec.android.app.sbrowser] (2c3d4e5):
+    userId=10045 gids=[3003]
+    pkg=Package{6a7b8c9 com.sec.android.app.sbrowser}
+    codePath=/system/app/SBrowser_3.0
+    versionCode=302000218 targetSdk=23
+    versionName=3.2.00.218
+    applicationInfo=ApplicationInfo{1f2e3d4 com.sec.android.app.sbrowser}
+    flags=[ HAS_CODE ALLOW_CLEAR_USER_DATA ]
+    pkgFlags=[ SYSTEM HAS_CODE ALLOW_CLEAR_USER_DATA ]
+    User 0:  installed=true hidden=false stopped=false notLaunched=false enabled=2
+"""
+
+class ParseDumpsysPackagesTest(unittest.TestCase):
+    def test_reads_version_state_type_and_location(self):
+        records = parse_dumpsys_packages(ANDROID_13.splitlines())
+        self.assertEqual(records['com.facebook.katana'], PackageInfo('402.0.0.29.104', 391100313, True, False, 'data'))
+
+    def test_user_0_disabled_by_user_is_not_enabled(self):
+        self.assertFalse(parse_dumpsys_packages(ANDROID_13.splitlines())['com.android.chrome'].enabled)
+
+    def test_hidden_system_packages_section_is_skipped(self):
+        records = parse_dumpsys_packages(ANDROID_13.splitlines())
+        self.assertEqual(set(records), {'com.android.chrome', 'com.facebook.katana'})
+        self.assertEqual(records['com.android.chrome'], PackageInfo('110.0.5481.154', 573712133, False, True, 'product'))
+
+    def test_system_flag_is_read_from_pkg_flags_on_older_releases(self):
+        info = parse_dumpsys_packages(ANDROID_6.splitlines())['com.sec.android.app.sbrowser']
+        self.assertEqual(info, PackageInfo('3.2.00.218', 302000218, False, True, 'system'))
+
+    def test_consumes_a_line_stream(self):
+        self.assertEqual(set(parse_dumpsys_packages(line for line in ANDROID_6.split('\n'))), {'com.sec.android.app.sbrowser'})
+
+if __name__ == '__main__':
+    unittest.main()
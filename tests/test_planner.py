@@ -0,0 +1,49 @@
+# Removal waves and at-risk dependents over a small hand-built catalog
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bw_remove'))
+from catalog import compile_catalog
+from planner import DependencyGraph, plan_removal
+
+def entry(pkg, dependencies=(), needed_by=()):
+    return {'id': pkg, 'list': 'Oem', 'removal': 'Recommended', 'description': '', 'dependencies': list(dependencies), 'neededBy': list(needed_by)}
+
+CATALOG = [
+    # Chain: chain.a -> chain.b -> chain.c ("->" reads "needs")
+    entry('chain.a', ['chain.b']), entry('chain.b', ['chain.c']), entry('chain.c'),
+    # Diamond: top needs left and right, which both need base; base declares the right-hand link from its own side
+    entry('diamond.top', ['diamond.left', 'diamond.right']), entry('diamond.left', ['diamond.base']), entry('diamond.right'),
+    entry('diamond.base', needed_by=['diamond.right']),
+    # Cycle: x and y need each other
+    entry('cycle.x', ['cycle.y']), entry('cycle.y', ['cycle.x']), entry('free'),
+]
+
+class PlannerTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = DependencyGraph(compile_catalog(CATALOG)[0])
+
+    def test_chain_is_removed_dependents_first(self):
+        self.assertEqual(self.graph.waves(['chain.c', 'chain.a', 'chain.b']), [['chain.a'], ['chain.b'], ['chain.c']])
+
+    def test_diamond_links_declared_on_either_side_are_ordered(self):
+        self.assertEqual(self.graph.waves(['diamond.base', 'diamond.left', 'diamond.right', 'diamond.top']),
+                         [['diamond.top'], ['diamond.left', 'diamond.right'], ['diamond.base']])
+
+    def test_cycle_is_removed_together_after_everything_else(self):
+        self.assertEqual(self.graph.waves(['cycle.x', 'cycle.y', 'free']), [['free'], ['cycle.x', 'cycle.y']])
+
+    def test_installed_unselected_dependents_are_at_risk(self):
+        plan = plan_removal(self.graph, {'chain.c'}, installed={'chain.b', 'chain.c', 'free'})
+        self.assertEqual(plan.waves, [['chain.c']])
+        # chain.a also needs chain.c (through chain.b) but is not installed, so it is not reported.
+        self.assertEqual(plan.at_risk, {'chain.b': ['chain.c']})
+        transitive = plan_removal(self.graph, {'chain.c'}, installed={'chain.a', 'chain.b', 'chain.c'})
+        self.assertEqual(transitive.at_risk, {'chain.a': ['chain.b'], 'chain.b': ['chain.c']})
+
+    def test_selecting_the_dependents_too_clears_the_risk(self):
+        plan = plan_removal(self.graph, {'diamond.base', 'diamond.left', 'diamond.right', 'diamond.top'}, installed={'diamond.base', 'diamond.left', 'diamond.right', 'diamond.top'})
+        self.assertEqual((len(plan.waves), plan.at_risk), (3, {}))
+
+if __name__ == '__main__':
+    unittest.main()